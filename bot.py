@@ -1,7 +1,12 @@
 import os
+import json
+import time
+import asyncio
+import hashlib
 import logging
 from dotenv import load_dotenv
 import discord
+from discord import app_commands
 from discord.ext import commands
 
 load_dotenv()
@@ -10,39 +15,188 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 if not DISCORD_TOKEN:
     raise RuntimeError("DISCORD_TOKEN must be set in environment")
 
+# Guild to register commands in instantly during development (0 = global only)
+DEV_GUILD_ID = int(os.getenv("DEV_GUILD_ID", "0"))
+COMMAND_HASH_FILE = os.getenv("COMMAND_HASH_FILE", ".command_tree_hash")
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "").lower() in ("1", "true", "yes")
+# Total shards across all processes (0 = Discord's recommendation) and the shards run by this process
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_IDS = [int(part) for part in os.getenv("SHARD_IDS", "").split(",") if part.strip()] or None
+if SHARD_IDS and not SHARD_COUNT:
+    raise RuntimeError("SHARD_COUNT must be set when SHARD_IDS is")
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ptero-bot")
 
+# Imported after load_dotenv: utils.api reads the panel settings at import time
+from utils import api as ptero_api  # noqa: E402
+from utils import client_api  # noqa: E402
+from utils import embeds  # noqa: E402
+from utils import ownership  # noqa: E402
+from utils import plans  # noqa: E402
+from utils.coordination import coordinator  # noqa: E402
+from utils.transformers import PanelTransformer  # noqa: E402
+
 intents = discord.Intents.default()
 intents.members = True  # needed to DM members reliably and resolve mentions
 
-# We use commands.Bot to easily load cogs. Slash commands registered via bot.tree
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-
-@bot.event
-async def on_ready():
-    logger.info(f"Logged in as {bot.user} (ID: {bot.user.id})")
-    try:
-        await bot.tree.sync()
-        logger.info("Slash commands synced.")
-    except Exception as e:
-        logger.exception("Failed to sync commands: %s", e)
-
-
 # Load cogs
 COGS = [
+    "cogs.jobs",
     "cogs.servers",
     "cogs.users",
     "cogs.panel",
+    "cogs.reconcile",
+    "cogs.self_service",
+    "cogs.power",
+    "cogs.backups",
+    "cogs.permissions",
+    "cogs.analytics",
 ]
 
-if __name__ == "__main__":
-    for cog in COGS:
+
+class PteroBot(commands.AutoShardedBot):
+    """Bot with a startup pipeline: concurrent cog loading, cached command sync, cache prewarm.
+
+    Several processes can split the shards between them (``SHARD_IDS``); they
+    coordinate through ``utils.coordination`` and only the elected leader
+    polls the panel in the background.
+    """
+
+    def __init__(self):
+        super().__init__(command_prefix="!", intents=intents, shard_count=SHARD_COUNT or None, shard_ids=SHARD_IDS)
+        self._prewarm_task = None
+
+    async def setup_hook(self):
+        started = time.perf_counter()
+        # Elect before the cogs start their loops so a single process leads right away
+        await coordinator.start()
+        logger.info("Instance %s started as %s", coordinator.instance_id, "leader" if coordinator.is_leader else "follower")
+        await asyncio.gather(*(self._load_cog(cog) for cog in COGS))
+        loaded = time.perf_counter()
+        logger.info("Startup: loaded %d cogs in %.2fs", len(self.extensions), loaded - started)
+
         try:
-            bot.load_extension(cog)
-            logger.info("Loaded cog %s", cog)
+            # The command tree is global: only the process running shard 0 syncs it
+            if SHARD_IDS is None or 0 in SHARD_IDS:
+                await self._sync_commands()
+        except Exception as e:
+            logger.exception("Failed to sync commands: %s", e)
+        logger.info("Startup: command sync phase took %.2fs", time.perf_counter() - loaded)
+
+        self._prewarm_task = asyncio.create_task(self._prewarm())
+
+    async def _load_cog(self, cog: str):
+        started = time.perf_counter()
+        try:
+            await self.load_extension(cog)
+            logger.info("Loaded cog %s in %.2fs", cog, time.perf_counter() - started)
         except Exception as e:
             logger.exception("Failed loading cog %s: %s", cog, e)
 
+    def _command_tree_hash(self) -> str:
+        payload = []
+        for command in self.tree.get_commands():
+            try:
+                payload.append(command.to_dict(self.tree))
+            except TypeError:
+                # discord.py < 2.4 takes no tree argument
+                payload.append(command.to_dict())
+        payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _read_sync_hashes(self) -> dict:
+        try:
+            with open(COMMAND_HASH_FILE, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_sync_hashes(self, hashes: dict):
+        try:
+            with open(COMMAND_HASH_FILE, "w", encoding="utf-8") as fh:
+                json.dump(hashes, fh)
+        except OSError:
+            logger.warning("Could not write %s; commands will be synced again next start", COMMAND_HASH_FILE)
+
+    async def _sync_commands(self):
+        """Sync the command tree only when it changed since the last successful sync."""
+        tree_hash = self._command_tree_hash()
+        hashes = self._read_sync_hashes()
+        if DEV_GUILD_ID:
+            guild = discord.Object(id=DEV_GUILD_ID)
+            scope = f"guild:{DEV_GUILD_ID}"
+            self.tree.copy_global_to(guild=guild)
+        else:
+            guild = None
+            scope = "global"
+        if not FORCE_COMMAND_SYNC and hashes.get(scope) == tree_hash:
+            logger.info("Slash commands unchanged (%s), skipping sync.", scope)
+            return
+        await self.tree.sync(guild=guild)
+        hashes[scope] = tree_hash
+        self._write_sync_hashes(hashes)
+        logger.info("Slash commands synced (%s).", scope)
+
+    async def _prewarm(self):
+        """Wait for the caches commands read to be warm and log how long it took.
+
+        The servers cog compiles plans (fetching their egg definitions
+        concurrently) and the self-service cog builds or loads the ownership
+        index of every panel at once, both starting as soon as they load.
+        """
+        started = time.perf_counter()
+        pending = []
+        servers_cog = self.get_cog("Servers")
+        if servers_cog is not None and servers_cog.plans_task is not None:
+            pending.append(servers_cog.plans_task)
+        self_service = self.get_cog("SelfService")
+        if self_service is not None:
+            pending.append(self_service.warm_task)
+        if pending:
+            await asyncio.wait(pending)
+        ready = sum(1 for index in ownership.indexes.values() if index.ready)
+        logger.info("Startup: caches warm in %.2fs (%d plans, %d/%d ownership indexes ready)", time.perf_counter() - started, len(plans.registry.plans), ready, len(ownership.indexes))
+
+    async def close(self):
+        if self._prewarm_task:
+            self._prewarm_task.cancel()
+        await super().close()
+        await client_api.close_clients()
+        await ptero_api.close_sessions()
+        await coordinator.stop()
+
+
+bot = PteroBot()
+
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    # The tree handler runs after the cog's; cogs with their own handler have already replied
+    cog = getattr(interaction.command, "binding", None)
+    if cog is not None and cog.has_app_command_error_handler():
+        return
+    if isinstance(error, app_commands.TransformerError) and isinstance(error.transformer, PanelTransformer):
+        embed = embeds.error_embed("Unknown panel", f"{error.value} is not a configured panel. Choose one of: {', '.join(ptero_api.panel_names())}")
+    elif isinstance(error, app_commands.CheckFailure):
+        embed = embeds.error_embed("Permission denied", "You are not allowed to use this command.")
+    else:
+        logger.error("Command %s failed", interaction.command.name if interaction.command else "?", exc_info=error)
+        embed = embeds.error_embed("Command failed", "Something went wrong. Please try again later.")
+    try:
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+    except discord.HTTPException:
+        pass
+
+
+@bot.event
+async def on_ready():
+    # Fires again on every reconnect; command sync happens once in setup_hook
+    logger.info(f"Logged in as {bot.user} (ID: {bot.user.id})")
+
+
+if __name__ == "__main__":
     bot.run(DISCORD_TOKEN)
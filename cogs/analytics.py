@@ -0,0 +1,127 @@
+import io
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Any
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from utils import api as ptero_api
+from utils import embeds
+from utils import auth
+from utils import ownership
+from utils.analytics import store, UsageReport
+from utils.coordination import coordinator
+
+# Seconds between usage snapshots (taken by the leader process only)
+ANALYTICS_SNAPSHOT_SECONDS = int(os.getenv("ANALYTICS_SNAPSHOT_SECONDS", "3600"))
+
+logger = logging.getLogger("ptero-bot.analytics")
+
+
+def _delta(start: int, end: int) -> str:
+    return f"{end} ({end - start:+d})"
+
+
+class Analytics(commands.Cog):
+    """Periodic usage snapshots and the /report command built from them."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        # Tick more often than snapshots are due so a new leader picks up where the old one left off
+        self.snapshot_loop.change_interval(seconds=min(ANALYTICS_SNAPSHOT_SECONDS, 300))
+
+    async def cog_load(self):
+        self.snapshot_loop.start()
+
+    async def cog_unload(self):
+        self.snapshot_loop.cancel()
+
+    @tasks.loop(seconds=300)
+    async def snapshot_loop(self):
+        if not coordinator.is_leader:
+            return
+        # A snapshot missing a panel would show all its servers as deleted
+        if not all(index.ready for index in ownership.indexes.values()):
+            return
+        try:
+            async with coordinator.lock("analytics:snapshot", ttl=300):
+                await asyncio.to_thread(store.load)
+                if time.time() - store.last_at < ANALYTICS_SNAPSHOT_SECONDS * 0.9:
+                    return
+                servers = {name: list(index.servers.values()) for name, index in ownership.indexes.items()}
+                nodes = {name: await self._nodes(name) for name in ptero_api.panels}
+                await asyncio.to_thread(store.append, time.time(), servers, nodes)
+            logger.info("Usage snapshot taken: %d servers", sum(len(s) for s in servers.values()))
+        except Exception:
+            logger.exception("Failed to take usage snapshot")
+
+    async def _nodes(self, panel: str) -> List[Dict[str, Any]]:
+        nodes: List[Dict[str, Any]] = []
+        try:
+            async for _, _, items in ptero_api.get_client(panel).iter_nodes():
+                nodes.extend(items)
+        except Exception as e:
+            # Node capacity is informational; server usage is still recorded
+            logger.warning("Could not list nodes of panel %s for the usage snapshot: %s", panel, e)
+        return nodes
+
+    def _owner_names(self, report: UsageReport) -> Dict[tuple, str]:
+        """Mention owners whose panel account is linked to a Discord member."""
+        linked = {
+            (name, panel_user_id): discord_id
+            for name, index in ownership.indexes.items()
+            for discord_id, panel_user_id in index.discord_to_panel.items()
+        }
+        names = {}
+        for panel, owner, *_ in report.owners:
+            discord_id = linked.get((panel, owner))
+            names[(panel, owner)] = f"<@{discord_id}>" if discord_id else f"user {owner}"
+        return names
+
+    def _embed(self, report: UsageReport, days: int) -> discord.Embed:
+        start, end = report.totals_start, report.totals_end
+        description = (
+            f"Servers: {_delta(start[0], end[0])}\n"
+            f"RAM: {_delta(start[1], end[1])} MB | CPU: {_delta(start[2], end[2])}% | Disk: {_delta(start[3], end[3])} MB\n"
+            f"Created: {report.created} | Deleted: {report.deleted}"
+        )
+        embed = embeds.success_embed(f"Usage report (last {days} days)", description, footer=f"{report.snapshots} snapshots since {datetime.fromtimestamp(report.start_at, tz=timezone.utc):%Y-%m-%d %H:%M} UTC")
+        embed.timestamp = datetime.fromtimestamp(report.end_at, tz=timezone.utc)
+
+        names = self._owner_names(report)
+        owners = [
+            f"{ptero_api.panel_tag(panel)}{names[(panel, owner)]}: {servers} servers | RAM {memory} MB | CPU {cpu}% | Disk {disk} MB"
+            for panel, owner, servers, memory, cpu, disk in report.owners
+        ]
+        embed.add_field(name="Top owners by RAM", value="\n".join(owners)[:1024] or "None", inline=False)
+
+        nodes = []
+        for (panel, node), usage in sorted(report.nodes.items()):
+            capacity = usage["capacity"][0]
+            used = f" / {capacity} MB ({usage['end'][1] * 100 // capacity}%)" if capacity else ""
+            nodes.append(f"{ptero_api.panel_tag(panel)}Node {node}: RAM {usage['start'][1]} → {usage['end'][1]} MB{used} | {usage['end'][0]} servers")
+        embed.add_field(name="Nodes", value="\n".join(nodes)[:1024] or "None", inline=False)
+        return embed
+
+    @app_commands.command(name="report", description="Usage report: totals, top owners and per-node trends")
+    @app_commands.describe(days="Days to cover (default 7)", top="Number of owners to list (default 10)")
+    @auth.require("reports")
+    async def report(self, interaction: discord.Interaction, days: app_commands.Range[int, 1, 366] = 7, top: app_commands.Range[int, 1, 50] = 10):
+        await interaction.response.defer(ephemeral=True)
+        report = await asyncio.to_thread(store.report, time.time() - days * 86400, top)
+        if report is None:
+            return await interaction.followup.send(embed=embeds.warn_embed("No data yet", f"No usage snapshots in the last {days} days. Snapshots are taken every {ANALYTICS_SNAPSHOT_SECONDS}s."), ephemeral=True)
+        files = [
+            discord.File(io.BytesIO(report.owners_csv().encode()), filename="owners.csv"),
+            discord.File(io.BytesIO(report.nodes_csv().encode()), filename="node_trends.csv"),
+        ]
+        await interaction.followup.send(embed=self._embed(report, days), files=files, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Analytics(bot))
@@ -0,0 +1,208 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional, List
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from utils import api as ptero_api
+from utils import embeds
+from utils import auth
+from utils import client_api
+from utils import backups
+from utils.coordination import coordinator, SHARED_STATE_POLL_SECONDS
+from utils.transformers import PanelName
+
+ADMIN_LOG_CHANNEL_ID = int(os.getenv("ADMIN_LOG_CHANNEL_ID", "0"))
+
+logger = logging.getLogger("ptero-bot.backups")
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def _inventories(panel: Optional[str]) -> List[backups.BackupInventory]:
+    """The named panel's inventory, or every panel's when ``panel`` is None."""
+    if panel:
+        return [backups.get_inventory(panel)]
+    return list(backups.inventories.values())
+
+
+def _inventory_footer(inventories: List[backups.BackupInventory], refresh: bool) -> str:
+    ready = [inv for inv in inventories if inv.ready]
+    age = int(time.time() - min(inv.built_at for inv in ready)) // 60
+    footer = f"Inventory of {sum(len(inv.servers) for inv in ready)} servers built {age} min ago"
+    building = [inv.panel for inv in inventories if not inv.ready]
+    if building:
+        footer += f" | Still building: {', '.join(building)}"
+    if refresh:
+        footer += " | Rebuild requested, run again in a few minutes"
+    return footer
+
+
+async def _snapshot(inventories: List[backups.BackupInventory], refresh: bool) -> bool:
+    """Whether any inventory can be shown yet; ``refresh`` asks the leader for a rebuild."""
+    if refresh:
+        await asyncio.gather(*(inv.request_refresh() for inv in inventories))
+    return any(inv.ready for inv in inventories)
+
+
+class Backups(commands.Cog):
+    """Backup management through the Client API."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.sync_inventories.change_interval(seconds=SHARED_STATE_POLL_SECONDS)
+
+    async def cog_load(self):
+        self.sync_inventories.start()
+
+    async def cog_unload(self):
+        self.sync_inventories.cancel()
+
+    @tasks.loop(seconds=30)
+    async def sync_inventories(self):
+        # The leader rebuilds stale inventories here, so commands never wait for a fan-out
+        await asyncio.gather(*(self._sync_logged(inv) for inv in backups.inventories.values()))
+
+    @sync_inventories.before_loop
+    async def _before_sync(self):
+        await self.bot.wait_until_ready()
+
+    async def _sync_logged(self, inventory: backups.BackupInventory):
+        try:
+            await inventory.sync()
+        except Exception:
+            logger.exception("Failed to sync backup inventory for panel %s", inventory.panel)
+
+    async def _log_admin(self, embed: discord.Embed):
+        if ADMIN_LOG_CHANNEL_ID == 0:
+            return
+        channel = self.bot.get_channel(ADMIN_LOG_CHANNEL_ID)
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(ADMIN_LOG_CHANNEL_ID)
+            except Exception:
+                return
+        try:
+            await channel.send(embed=embed)
+        except Exception:
+            pass
+
+    @app_commands.command(name="backup_list", description="List backups for a server")
+    @app_commands.describe(server_id="Server ID or identifier", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("backups")
+    async def backup_list(self, interaction: discord.Interaction, server_id: str, panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        identifier = await client_api.resolve_identifier(server_id, panel)
+        if identifier is None:
+            return await interaction.followup.send(embed=embeds.error_embed("Unknown server", f"Server {server_id} not found."), ephemeral=True)
+        resp = await client_api.get_client(panel).list_backups(identifier)
+        if resp.get("status") not in (200,):
+            return await interaction.followup.send(embed=embeds.error_embed("Failed to fetch backups", str(resp.get("data"))), ephemeral=True)
+        data = resp.get("data") or {}
+        lines = []
+        if isinstance(data, dict) and data.get("data"):
+            for b in data["data"]:
+                a = b.get("attributes", {})
+                lines.append(f"Backup ID: {a.get('uuid')} | Name: {a.get('name')} | Size: {_format_bytes(int(a.get('bytes') or 0))}")
+        description = "\n".join(lines) or "No backups found."
+        await interaction.followup.send(embed=embeds.success_embed("Backups", description), ephemeral=True)
+
+    @app_commands.command(name="backup_create", description="Start a backup of a server")
+    @app_commands.describe(server_id="Server ID or identifier", name="Optional backup name", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("backups")
+    async def backup_create(self, interaction: discord.Interaction, server_id: str, name: Optional[str] = None, panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        identifier = await client_api.resolve_identifier(server_id, panel)
+        if identifier is None:
+            return await interaction.followup.send(embed=embeds.error_embed("Unknown server", f"Server {server_id} not found."), ephemeral=True)
+        resp = await client_api.get_client(panel).create_backup(identifier, name)
+        if resp.get("status") not in (200, 201):
+            return await interaction.followup.send(embed=embeds.error_embed("Backup failed", str(resp.get("data"))), ephemeral=True)
+        await backups.get_inventory(panel).refresh_server(identifier)
+        backup_uuid = (resp.get("data") or {}).get("attributes", {}).get("uuid")
+        await self._log_admin(embeds.success_embed("Backup started", f"{interaction.user} started backup {backup_uuid} of {identifier}"))
+        await interaction.followup.send(embed=embeds.success_embed("Backup started", f"Backup {backup_uuid} of {identifier} is in progress."), ephemeral=True)
+
+    @app_commands.command(name="backup_delete", description="Delete a server backup")
+    @app_commands.describe(server_id="Server ID or identifier", backup_uuid="Backup UUID", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("backups")
+    async def backup_delete(self, interaction: discord.Interaction, server_id: str, backup_uuid: str, panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        identifier = await client_api.resolve_identifier(server_id, panel)
+        if identifier is None:
+            return await interaction.followup.send(embed=embeds.error_embed("Unknown server", f"Server {server_id} not found."), ephemeral=True)
+        resp = await client_api.get_client(panel).delete_backup(identifier, backup_uuid)
+        if resp.get("status") not in (200, 204):
+            return await interaction.followup.send(embed=embeds.error_embed("Delete failed", str(resp.get("data"))), ephemeral=True)
+        await backups.get_inventory(panel).refresh_server(identifier)
+        await self._log_admin(embeds.warn_embed("Backup deleted", f"{interaction.user} deleted backup {backup_uuid} of {identifier}"))
+        await interaction.followup.send(embed=embeds.success_embed("Backup deleted", f"Backup {backup_uuid} deleted."), ephemeral=True)
+
+    @app_commands.command(name="backup_restore", description="Restore a server from a backup")
+    @app_commands.describe(server_id="Server ID or identifier", backup_uuid="Backup UUID", truncate="Delete all files before restoring", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("backups")
+    async def backup_restore(self, interaction: discord.Interaction, server_id: str, backup_uuid: str, truncate: bool = False, panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        identifier = await client_api.resolve_identifier(server_id, panel)
+        if identifier is None:
+            return await interaction.followup.send(embed=embeds.error_embed("Unknown server", f"Server {server_id} not found."), ephemeral=True)
+        resp = await client_api.get_client(panel).restore_backup(identifier, backup_uuid, truncate=truncate)
+        if resp.get("status") not in (200, 204):
+            return await interaction.followup.send(embed=embeds.error_embed("Restore failed", str(resp.get("data"))), ephemeral=True)
+        await self._log_admin(embeds.warn_embed("Backup restore", f"{interaction.user} restored {identifier} from {backup_uuid} (truncate={truncate})"))
+        await interaction.followup.send(embed=embeds.success_embed("Restore started", f"{identifier} is restoring from {backup_uuid}."), ephemeral=True)
+
+    @app_commands.command(name="backups_stale", description="Servers with no successful backup in N days")
+    @app_commands.describe(days="Age threshold in days", refresh="Rebuild the inventory in the background", panel="Only this panel (all panels if omitted)")
+    @auth.require("backups")
+    async def backups_stale(self, interaction: discord.Interaction, days: int = 7, refresh: bool = False, panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        inventories = _inventories(panel)
+        if not await _snapshot(inventories, refresh):
+            return await interaction.followup.send(embed=embeds.warn_embed("Inventory not ready", "The backup inventory is still being built. Try again in a few minutes."), ephemeral=True)
+        stale = sorted(
+            ((inv.panel, e) for inv in inventories for e in inv.stale_servers(days)),
+            key=lambda pe: pe[1].last_successful or 0,
+        )
+        lines = []
+        for name, e in stale[:25]:
+            last = e.last_successful
+            when = datetime.fromtimestamp(last, tz=timezone.utc).strftime("%Y-%m-%d") if last else "never"
+            lines.append(f"{ptero_api.panel_tag(name)}{e.name} ({e.identifier}) | Owner: {e.owner} | Last backup: {when}")
+        if len(stale) > 25:
+            lines.append(f"... and {len(stale) - 25} more")
+        description = "\n".join(lines) or f"Every server has a backup from the last {days} days."
+        await interaction.followup.send(embed=embeds.warn_embed(f"No backup in {days} days: {len(stale)} servers", description, footer=_inventory_footer(inventories, refresh)), ephemeral=True)
+
+    @app_commands.command(name="backups_by_owner", description="Total backup size per owner")
+    @app_commands.describe(refresh="Rebuild the inventory in the background", panel="Only this panel (all panels if omitted)")
+    @auth.require("backups")
+    async def backups_by_owner(self, interaction: discord.Interaction, refresh: bool = False, panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        inventories = _inventories(panel)
+        if not await _snapshot(inventories, refresh):
+            return await interaction.followup.send(embed=embeds.warn_embed("Inventory not ready", "The backup inventory is still being built. Try again in a few minutes."), ephemeral=True)
+        # Panel user IDs are per panel, so owners are never merged across panels
+        totals = sorted(
+            ((inv.panel, owner, size) for inv in inventories for owner, size in inv.bytes_by_owner()),
+            key=lambda t: t[2],
+            reverse=True,
+        )
+        lines = [f"{ptero_api.panel_tag(name)}Owner {owner}: {_format_bytes(size)}" for name, owner, size in totals[:25]]
+        description = "\n".join(lines) or "No backups found."
+        await interaction.followup.send(embed=embeds.success_embed("Backup size per owner", description, footer=_inventory_footer(inventories, refresh)), ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Backups(bot))
@@ -0,0 +1,44 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import embeds
+from utils import auth
+from utils import jobs
+from utils import mutations  # noqa: F401  registers the job handlers
+
+
+class Jobs(commands.Cog):
+    """Runs the persistent panel job queue and exposes its state."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        await jobs.queue.start()
+
+    async def cog_unload(self):
+        await jobs.queue.stop()
+
+    @app_commands.command(name="job_status", description="Show the state of a queued panel job")
+    @app_commands.describe(job_id="Job number")
+    @auth.require("jobs")
+    async def job_status(self, interaction: discord.Interaction, job_id: int):
+        await interaction.response.defer(ephemeral=True)
+        job = await jobs.queue.get(job_id)
+        if job is None:
+            return await interaction.followup.send(embed=embeds.error_embed("Unknown job", f"No job #{job_id}."), ephemeral=True)
+        await interaction.followup.send(embed=embeds.job_embed(job), ephemeral=True)
+
+    @app_commands.command(name="jobs", description="List recent panel jobs")
+    @auth.require("jobs")
+    async def list_jobs(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        recent = await jobs.queue.recent(15)
+        lines = [f"#{j.id} {j.kind} | {j.state} | attempts {j.attempts}" for j in recent]
+        description = "\n".join(lines) or "No jobs recorded."
+        await interaction.followup.send(embed=embeds.success_embed("Recent jobs", description), ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Jobs(bot))
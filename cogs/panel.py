@@ -6,16 +6,13 @@ from discord import app_commands
 from discord.ext import commands
 
 from utils import api as ptero_api
+from utils import client_api
 from utils import embeds
-from utils import checks
+from utils import auth
 
 ADMIN_LOG_CHANNEL_ID = int(os.getenv("ADMIN_LOG_CHANNEL_ID", "0"))
 
 
-def _is_admin(interaction: discord.Interaction) -> bool:
-    return checks.is_admin_id(interaction.user.id)
-
-
 class Panel(commands.Cog):
     """Panel and infrastructure commands."""
 
@@ -39,64 +36,46 @@ class Panel(commands.Cog):
     @app_commands.command(name="nodes", description="List nodes")
     async def nodes(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        resp = await ptero_api.list_nodes()
-        if resp.get("status") not in (200,):
-            return await interaction.followup.send(embed=embeds.error_embed("Failed to fetch nodes", str(resp.get("data"))), ephemeral=True)
-        data = resp.get("data") or {}
+        results = await ptero_api.fan_out(lambda c: c.list_nodes())
+        if not any(resp.get("status") == 200 for _, resp in results):
+            return await interaction.followup.send(embed=embeds.error_embed("Failed to fetch nodes", str(results[0][1].get("data"))), ephemeral=True)
         lines = []
-        if isinstance(data, dict) and data.get("data"):
-            for n in data["data"]:
-                a = n.get("attributes", {})
-                lines.append(f"{a.get('name')} (ID: {a.get('id')}) Location: {a.get('location_id')}")
+        for panel, a in ptero_api.merged_attributes(results):
+            lines.append(f"{ptero_api.panel_tag(panel)}{a.get('name')} (ID: {a.get('id')}) Location: {a.get('location_id')}")
         description = "\n".join(lines) or "No nodes found."
-        await interaction.followup.send(embed=embeds.success_embed("Nodes", description), ephemeral=True)
+        await interaction.followup.send(embed=embeds.success_embed("Nodes", description, footer=embeds.fan_out_footer(results)), ephemeral=True)
 
     @app_commands.command(name="eggs", description="List eggs")
     async def eggs(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        resp = await ptero_api.list_eggs()
-        if resp.get("status") not in (200,):
-            return await interaction.followup.send(embed=embeds.error_embed("Failed to fetch eggs", str(resp.get("data"))), ephemeral=True)
-        data = resp.get("data") or {}
+        results = await ptero_api.fan_out(lambda c: c.list_eggs())
+        if not any(resp.get("status") == 200 for _, resp in results):
+            return await interaction.followup.send(embed=embeds.error_embed("Failed to fetch eggs", str(results[0][1].get("data"))), ephemeral=True)
         lines = []
-        if isinstance(data, dict) and data.get("data"):
-            for e in data["data"]:
-                a = e.get("attributes", {})
-                lines.append(f"{a.get('name')} (ID: {a.get('id')}) Nest: {a.get('nest')}")
+        for panel, a in ptero_api.merged_attributes(results):
+            lines.append(f"{ptero_api.panel_tag(panel)}{a.get('name')} (ID: {a.get('id')}) Nest: {a.get('nest')}")
         description = "\n".join(lines) or "No eggs found."
-        await interaction.followup.send(embed=embeds.success_embed("Eggs", description), ephemeral=True)
+        await interaction.followup.send(embed=embeds.success_embed("Eggs", description, footer=embeds.fan_out_footer(results)), ephemeral=True)
 
     @app_commands.command(name="panel_status", description="Check panel status (simple)")
     async def panel_status(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        ok = await ptero_api.ping_panel()
-        if ok:
-            await interaction.followup.send(embed=embeds.success_embed("Panel status", "Panel is reachable"), ephemeral=True)
-        else:
-            await interaction.followup.send(embed=embeds.error_embed("Panel unreachable", "Could not reach panel API"), ephemeral=True)
-
-    @app_commands.command(name="backup_list", description="List backups for a server")
-    @app_commands.describe(server_id="Server ID")
-    async def backup_list(self, interaction: discord.Interaction, server_id: str):
-        await interaction.response.defer(ephemeral=True)
-        resp = await ptero_api.list_backups(server_id)
-        if resp.get("status") not in (200,):
-            return await interaction.followup.send(embed=embeds.error_embed("Failed to fetch backups", str(resp.get("data"))), ephemeral=True)
-        data = resp.get("data") or {}
+        results = await ptero_api.fan_out(lambda c: c.ping_panel())
         lines = []
-        if isinstance(data, dict) and data.get("data"):
-            for b in data["data"]:
-                a = b.get("attributes", {})
-                lines.append(f"Backup ID: {a.get('uuid')} | Name: {a.get('name')} | Size: {a.get('bytes')}")
-        description = "\n".join(lines) or "No backups found."
-        await interaction.followup.send(embed=embeds.success_embed("Backups", description), ephemeral=True)
+        for panel, ok in results:
+            state = "reachable" if ok is True else "unreachable"
+            lines.append(f"{panel}: {state} | circuit breaker: {ptero_api.get_client(panel).breaker.describe()} | client API: {client_api.get_client(panel).breaker.describe()}")
+        description = "\n".join(lines)
+        if all(ok is True for _, ok in results):
+            await interaction.followup.send(embed=embeds.success_embed("Panel status", description), ephemeral=True)
+        else:
+            await interaction.followup.send(embed=embeds.error_embed("Panel unreachable", description), ephemeral=True)
 
     @app_commands.command(name="maintenance_on", description="Set maintenance mode ON for a server (sends DM)")
     @app_commands.describe(server_id="Server ID or UUID", user="Discord user to notify")
+    @auth.require("panel")
     async def maintenance_on(self, interaction: discord.Interaction, server_id: str, user: discord.User):
         await interaction.response.defer(ephemeral=True)
-        if not _is_admin(interaction):
-            return await interaction.followup.send(embed=embeds.error_embed("Permission denied", "You are not allowed to use this command."), ephemeral=True)
         # NOTE: Pterodactyl does not have a universal "maintenance" API endpoint across all versions.
         # We'll inform the user and log — implement your panel-specific maintenance toggle if available.
         dm_embed = embeds.warn_embed("⚠️ MAINTENANCE ON", f"Server ID: {server_id}\nMaintenance: ON")
@@ -106,10 +85,9 @@ class Panel(commands.Cog):
 
     @app_commands.command(name="maintenance_off", description="Set maintenance mode OFF for a server (sends DM)")
     @app_commands.describe(server_id="Server ID or UUID", user="Discord user to notify")
+    @auth.require("panel")
     async def maintenance_off(self, interaction: discord.Interaction, server_id: str, user: discord.User):
         await interaction.response.defer(ephemeral=True)
-        if not _is_admin(interaction):
-            return await interaction.followup.send(embed=embeds.error_embed("Permission denied", "You are not allowed to use this command."), ephemeral=True)
         dm_embed = embeds.success_embed("✅ MAINTENANCE OFF", f"Server ID: {server_id}\nMaintenance: OFF")
         dm_sent = await self._dm_user_or_log(user, dm_embed, fallback_text=f"Maintenance OFF for {server_id}")
         await self._log_admin(embeds.success_embed("Maintenance toggled OFF", f"{interaction.user} set maintenance OFF for {server_id}. DM sent: {dm_sent}"))
@@ -0,0 +1,70 @@
+import os
+import signal
+import asyncio
+import logging
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import embeds
+from utils import auth
+
+ADMIN_LOG_CHANNEL_ID = int(os.getenv("ADMIN_LOG_CHANNEL_ID", "0"))
+
+logger = logging.getLogger("ptero-bot.permissions")
+
+
+class Permissions(commands.Cog):
+    """Reloads admin and scope permissions on SIGHUP or on command."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._signal_installed = False
+
+    async def cog_load(self):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self._on_sighup)
+            self._signal_installed = True
+        except (AttributeError, NotImplementedError):
+            # No SIGHUP on Windows; /permissions_reload still works
+            pass
+
+    async def cog_unload(self):
+        if self._signal_installed:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+
+    def _on_sighup(self):
+        try:
+            auth.reload()
+        except ValueError as e:
+            logger.error("Permission reload failed, keeping the current permissions: %s", e)
+
+    async def _log_admin(self, embed: discord.Embed):
+        if ADMIN_LOG_CHANNEL_ID == 0:
+            return
+        channel = self.bot.get_channel(ADMIN_LOG_CHANNEL_ID)
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(ADMIN_LOG_CHANNEL_ID)
+            except Exception:
+                return
+        try:
+            await channel.send(embed=embed)
+        except Exception:
+            pass
+
+    @app_commands.command(name="permissions_reload", description="Reload admin IDs, admin roles and permission scopes from .env")
+    @auth.require()
+    async def permissions_reload(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        try:
+            updated = auth.reload()
+        except ValueError as e:
+            return await interaction.followup.send(embed=embeds.error_embed("Reload failed", f"{e}\nThe current permissions were kept."), ephemeral=True)
+        await self._log_admin(embeds.warn_embed("Permissions reloaded", f"{interaction.user} reloaded permissions: {updated.describe()}"))
+        await interaction.followup.send(embed=embeds.success_embed("Permissions reloaded", updated.describe()), ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Permissions(bot))
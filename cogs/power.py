@@ -0,0 +1,101 @@
+import os
+from typing import List, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import api as ptero_api
+from utils import embeds
+from utils import auth
+from utils import ownership
+from utils import client_api
+from utils.transformers import PanelName
+
+ADMIN_LOG_CHANNEL_ID = int(os.getenv("ADMIN_LOG_CHANNEL_ID", "0"))
+
+SIGNAL_CHOICES = [app_commands.Choice(name=s, value=s) for s in client_api.POWER_SIGNALS]
+
+
+class Power(commands.Cog):
+    """Power actions and console commands through the Client API."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_unload(self):
+        await client_api.close_clients()
+
+    async def _log_admin(self, embed: discord.Embed):
+        if ADMIN_LOG_CHANNEL_ID == 0:
+            return
+        channel = self.bot.get_channel(ADMIN_LOG_CHANNEL_ID)
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(ADMIN_LOG_CHANNEL_ID)
+            except Exception:
+                return
+        try:
+            await channel.send(embed=embed)
+        except Exception:
+            pass
+
+    async def _node_identifiers(self, node_id: int, panel: Optional[str] = None) -> List[str]:
+        index = ownership.get_index(panel)
+        if index.ready:
+            servers = index.servers.values()
+        else:
+            servers = []
+            async for _, _, items in ptero_api.get_client(panel).iter_servers():
+                servers.extend(items)
+        return [s["identifier"] for s in servers if s.get("node") == node_id and s.get("identifier")]
+
+    @app_commands.command(name="power", description="Send a power action to a server")
+    @app_commands.describe(server_id="Server ID or identifier", signal="Power action", panel="Panel the server is on (default panel if omitted)")
+    @app_commands.choices(signal=SIGNAL_CHOICES)
+    @auth.require("power")
+    async def power(self, interaction: discord.Interaction, server_id: str, signal: app_commands.Choice[str], panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        identifier = await client_api.resolve_identifier(server_id, panel)
+        if identifier is None:
+            return await interaction.followup.send(embed=embeds.error_embed("Unknown server", f"Server {server_id} not found."), ephemeral=True)
+        resp = await client_api.get_client(panel).power(identifier, signal.value)
+        if resp.get("status") in (204, 200):
+            await self._log_admin(embeds.warn_embed("Power action", f"{interaction.user} sent {signal.value} to {identifier}"))
+            return await interaction.followup.send(embed=embeds.success_embed("Power action sent", f"{signal.value} sent to {identifier}."), ephemeral=True)
+        return await interaction.followup.send(embed=embeds.error_embed("Power action failed", str(resp.get("data"))), ephemeral=True)
+
+    @app_commands.command(name="console", description="Send a console command to a server")
+    @app_commands.describe(server_id="Server ID or identifier", command="Console command to run", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("power")
+    async def console(self, interaction: discord.Interaction, server_id: str, command: str, panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        identifier = await client_api.resolve_identifier(server_id, panel)
+        if identifier is None:
+            return await interaction.followup.send(embed=embeds.error_embed("Unknown server", f"Server {server_id} not found."), ephemeral=True)
+        resp = await client_api.get_client(panel).send_command(identifier, command)
+        if resp.get("status") in (204, 200):
+            await self._log_admin(embeds.warn_embed("Console command", f"{interaction.user} ran `{command}` on {identifier}"))
+            return await interaction.followup.send(embed=embeds.success_embed("Command sent", f"`{command}` sent to {identifier}."), ephemeral=True)
+        return await interaction.followup.send(embed=embeds.error_embed("Command failed", str(resp.get("data"))), ephemeral=True)
+
+    @app_commands.command(name="power_node", description="Send a power action to every server on a node")
+    @app_commands.describe(node_id="Node ID", signal="Power action", panel="Panel the node belongs to (default panel if omitted)")
+    @app_commands.choices(signal=SIGNAL_CHOICES)
+    @auth.require("power")
+    async def power_node(self, interaction: discord.Interaction, node_id: int, signal: app_commands.Choice[str], panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        identifiers = await self._node_identifiers(node_id, panel)
+        if not identifiers:
+            return await interaction.followup.send(embed=embeds.warn_embed("No servers", f"No servers found on node {node_id}."), ephemeral=True)
+        results = await client_api.get_client(panel).bulk_power(identifiers, signal.value)
+        failed = [f"{identifier} (status {status})" for identifier, status in results if status not in (204, 200)]
+        summary = f"{signal.value} sent to {len(results) - len(failed)}/{len(results)} servers on node {node_id}."
+        await self._log_admin(embeds.warn_embed("Bulk power action", f"{interaction.user}: {summary}"))
+        if failed:
+            return await interaction.followup.send(embed=embeds.warn_embed("Bulk power action finished with errors", summary + "\nFailed:\n" + "\n".join(failed[:25])), ephemeral=True)
+        await interaction.followup.send(embed=embeds.success_embed("Bulk power action finished", summary), ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Power(bot))
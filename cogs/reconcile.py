@@ -0,0 +1,164 @@
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Set
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from utils import api as ptero_api
+from utils import embeds
+from utils import auth
+from utils.coordination import coordinator
+from utils.ratelimit import RateLimiter
+from utils.reconcile import Reconciler, ReconcileReport
+from utils.transformers import PanelName
+
+ADMIN_LOG_CHANNEL_ID = int(os.getenv("ADMIN_LOG_CHANNEL_ID", "0"))
+MAX_RAM = int(os.getenv("MAX_RAM", "32768"))
+MAX_CPU = int(os.getenv("MAX_CPU", "800"))
+MAX_DISK = int(os.getenv("MAX_DISK", "200000"))
+# Seconds between reconciliation steps, pages fetched per step and requests/second budget
+RECONCILE_STEP_SECONDS = int(os.getenv("RECONCILE_STEP_SECONDS", "30"))
+RECONCILE_PAGES_PER_STEP = int(os.getenv("RECONCILE_PAGES_PER_STEP", "5"))
+RECONCILE_RATE = float(os.getenv("RECONCILE_RATE", "1"))
+RECONCILE_GUILD_ID = int(os.getenv("RECONCILE_GUILD_ID", "0"))
+# Seconds between each process publishing the members of its shards
+MEMBER_PUBLISH_SECONDS = int(os.getenv("MEMBER_PUBLISH_SECONDS", "120"))
+
+logger = logging.getLogger("ptero-bot.reconcile")
+
+
+def _format_rows(rows, limit: int = 15) -> str:
+    lines = [" | ".join(str(col) for col in row) for row in rows[:limit]]
+    if len(rows) > limit:
+        lines.append(f"... and {len(rows) - limit} more")
+    return "\n".join(lines) or "None"
+
+
+class Reconcile(commands.Cog):
+    """Background drift detection between Discord members and the panel.
+
+    Only the leader process scans the panel.  Each process sees only the
+    guilds of its own shards, so every process publishes its members and the
+    leader joins against the union of all shards.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        # One reconciler per panel, each paced by its own request budget
+        self.reconcilers: Dict[str, Reconciler] = {
+            name: Reconciler(
+                client,
+                limits={"memory": MAX_RAM, "cpu": MAX_CPU, "disk": MAX_DISK},
+                limiter=RateLimiter(RECONCILE_RATE),
+                pages_per_step=RECONCILE_PAGES_PER_STEP,
+            )
+            for name, client in ptero_api.panels.items()
+        }
+        self.reconcile_loop.change_interval(seconds=RECONCILE_STEP_SECONDS)
+        self.publish_members.change_interval(seconds=MEMBER_PUBLISH_SECONDS)
+
+    async def cog_load(self):
+        self.publish_members.start()
+        self.reconcile_loop.start()
+
+    async def cog_unload(self):
+        self.publish_members.cancel()
+        self.reconcile_loop.cancel()
+
+    async def _log_admin(self, embed: discord.Embed):
+        if ADMIN_LOG_CHANNEL_ID == 0:
+            return
+        channel = self.bot.get_channel(ADMIN_LOG_CHANNEL_ID)
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(ADMIN_LOG_CHANNEL_ID)
+            except Exception:
+                return
+        try:
+            await channel.send(embed=embed)
+        except Exception:
+            pass
+
+    def _local_shards(self) -> List[int]:
+        shard_ids = getattr(self.bot, "shard_ids", None)
+        return list(shard_ids) if shard_ids else list(range(self.bot.shard_count or 1))
+
+    @tasks.loop(seconds=120)
+    async def publish_members(self):
+        guilds = self.bot.guilds
+        if RECONCILE_GUILD_ID:
+            guilds = [g for g in guilds if g.id == RECONCILE_GUILD_ID]
+        for shard_id in self._local_shards():
+            members = sorted({m.id for g in guilds if g.shard_id == shard_id for m in g.members})
+            try:
+                await coordinator.set_json(f"members:shard:{shard_id}", members, ttl=MEMBER_PUBLISH_SECONDS * 3)
+            except Exception:
+                logger.exception("Failed to publish members of shard %s", shard_id)
+
+    @publish_members.before_loop
+    async def _before_publish(self):
+        await self.bot.wait_until_ready()
+
+    async def _member_ids(self) -> Optional[Set[int]]:
+        """Members across all shards, or None while some shard has not published yet."""
+        member_ids: Set[int] = set()
+        for shard_id in range(self.bot.shard_count or 1):
+            members = await coordinator.get_json(f"members:shard:{shard_id}")
+            if members is None:
+                return None
+            member_ids.update(members)
+        return member_ids
+
+    @tasks.loop(seconds=30)
+    async def reconcile_loop(self):
+        if not coordinator.is_leader:
+            return
+        member_ids = await self._member_ids()
+        if member_ids is None:
+            # Joining against a partial member list would report false orphans
+            logger.info("Waiting for every shard to publish its members before reconciling")
+            return
+        for name, reconciler in self.reconcilers.items():
+            try:
+                report = await reconciler.step(member_ids)
+            except Exception:
+                logger.exception("Reconciliation step for panel %s failed at %s", name, reconciler.progress())
+                continue
+            if report is None:
+                continue
+            await coordinator.set_json(f"reconcile:{name}", report.to_dict())
+            logger.info("Reconciliation pass for panel %s finished: %s", name, report.summary().replace("\n", "; "))
+            if report.orphan_users or report.orphan_servers or report.limit_violations:
+                await self._log_admin(embeds.warn_embed(f"Panel drift detected ({name})", report.summary(), footer="Use /reconcile_report for details"))
+
+    @reconcile_loop.before_loop
+    async def _before_reconcile(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="reconcile_report", description="Show the last Discord/panel drift report")
+    @app_commands.describe(panel="Panel to report on (default panel if omitted)")
+    @auth.require("reconcile")
+    async def reconcile_report(self, interaction: discord.Interaction, panel: Optional[PanelName] = None):
+        await interaction.response.defer(ephemeral=True)
+        panel = panel or ptero_api.DEFAULT_PANEL
+        published = await coordinator.get_json(f"reconcile:{panel}")
+        report = ReconcileReport.from_dict(published) if published else None
+        if coordinator.is_leader:
+            progress = f"Current pass on {panel}: {self.reconcilers[panel].progress()}"
+        else:
+            progress = f"Scans run on instance {await coordinator.leader() or '(electing)'}"
+        if report is None:
+            return await interaction.followup.send(embed=embeds.warn_embed("No report yet", "The first reconciliation pass has not finished.", footer=progress), ephemeral=True)
+        embed = embeds.warn_embed("Drift report", report.summary(), footer=progress)
+        embed.timestamp = datetime.fromtimestamp(report.finished_at, tz=timezone.utc)
+        embed.add_field(name="Orphaned users (panel ID | username | Discord ID)", value=_format_rows(report.orphan_users)[:1024], inline=False)
+        embed.add_field(name="Orphaned servers (ID | name | owner)", value=_format_rows(report.orphan_servers)[:1024], inline=False)
+        embed.add_field(name="Limit violations (ID | name | detail)", value=_format_rows(report.limit_violations)[:1024], inline=False)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Reconcile(bot))
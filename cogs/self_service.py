@@ -0,0 +1,214 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Optional, List, Tuple
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from utils import api as ptero_api
+from utils import embeds
+from utils import ownership
+from utils import client_api
+from utils.coordination import coordinator, SHARED_STATE_POLL_SECONDS
+from utils.ratelimit import RateLimiter, UserQuota
+
+OWNERSHIP_REFRESH_SECONDS = int(os.getenv("OWNERSHIP_REFRESH_SECONDS", "300"))
+OWNERSHIP_REFRESH_RATE = float(os.getenv("OWNERSHIP_REFRESH_RATE", "2"))
+SELF_SERVICE_COOLDOWN = float(os.getenv("SELF_SERVICE_COOLDOWN", "5"))
+SELF_SERVICE_QUOTA = int(os.getenv("SELF_SERVICE_QUOTA", "60"))
+SELF_SERVICE_QUOTA_WINDOW = int(os.getenv("SELF_SERVICE_QUOTA_WINDOW", "3600"))
+
+logger = logging.getLogger("ptero-bot.self_service")
+
+
+class QuotaExceeded(app_commands.CheckFailure):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Quota exceeded, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _quota():
+    """Spend one use of the member's quota.
+
+    Checks run bottom-up, so place this above the cooldown: calls rejected for
+    cooldown then do not use up quota.
+    """
+
+    def predicate(interaction: discord.Interaction) -> bool:
+        quota = interaction.command.binding.quota
+        if not quota.consume(interaction.user.id):
+            raise QuotaExceeded(quota.retry_after(interaction.user.id))
+        return True
+
+    return app_commands.check(predicate)
+
+
+def _server_line(panel: str, attr: dict) -> str:
+    limits = attr.get("limits") or {}
+    state = "suspended" if attr.get("suspended") else (attr.get("status") or "active")
+    return f"{ptero_api.panel_tag(panel)}{attr.get('name')} (ID: {attr.get('id')} / {attr.get('identifier')}) | {state} | RAM {limits.get('memory')} MB | CPU {limits.get('cpu')} | Disk {limits.get('disk')} MB"
+
+
+class SelfService(commands.Cog):
+    """Commands any member can run against the servers they own."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.quota = UserQuota(SELF_SERVICE_QUOTA, SELF_SERVICE_QUOTA_WINDOW)
+        self.limiter = RateLimiter(OWNERSHIP_REFRESH_RATE)
+        # Followers pick up the leader's index more often than the leader rebuilds it
+        self.refresh_index.change_interval(seconds=min(OWNERSHIP_REFRESH_SECONDS, SHARED_STATE_POLL_SECONDS))
+
+    async def cog_load(self):
+        self.warm_task = asyncio.create_task(self._warm())
+        self.refresh_index.start()
+
+    async def cog_unload(self):
+        self.warm_task.cancel()
+        self.refresh_index.cancel()
+
+    async def _warm(self):
+        """Build (leader) or load (followers) every index at startup, all panels at once.
+
+        The background pacing is skipped here; the panel's own rate limiter still applies.
+        """
+        await asyncio.gather(*(self._sync_logged(name, index, None) for name, index in ownership.indexes.items()))
+
+    @tasks.loop(seconds=300)
+    async def refresh_index(self):
+        # One panel failing must not keep the others' indexes stale
+        for name, index in ownership.indexes.items():
+            await self._sync_logged(name, index, self.limiter)
+
+    @refresh_index.before_loop
+    async def _before_refresh(self):
+        await asyncio.wait([self.warm_task])
+
+    async def _sync_logged(self, name: str, index: ownership.OwnershipIndex, limiter: Optional[RateLimiter]):
+        try:
+            await self._sync_index(name, index, limiter)
+        except Exception:
+            logger.exception("Failed to rebuild ownership index for panel %s", name)
+
+    async def _sync_index(self, name: str, index: ownership.OwnershipIndex, limiter: Optional[RateLimiter]):
+        """Adopt the index published by the leader; the leader also rebuilds it when due."""
+        key = f"ownership:{name}"
+        published_at = await coordinator.get_json(f"{key}:version") or 0
+        if published_at > index.refreshed_at:
+            index.load_snapshot(await coordinator.get_json(key))
+        if not coordinator.is_leader or time.time() - index.refreshed_at < OWNERSHIP_REFRESH_SECONDS:
+            return
+        await index.refresh(limiter=limiter)
+        await coordinator.set_json(key, index.snapshot())
+        await coordinator.set_json(f"{key}:version", index.refreshed_at)
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, app_commands.CommandOnCooldown):
+            embed = embeds.warn_embed("Slow down", f"Try again in {error.retry_after:.0f}s.")
+        elif isinstance(error, QuotaExceeded):
+            embed = embeds.warn_embed("Quota reached", f"You have used all {SELF_SERVICE_QUOTA} requests for now. Try again in {error.retry_after:.0f}s.")
+        else:
+            logger.error("Self-service command failed", exc_info=error)
+            embed = embeds.error_embed("Command failed", "Something went wrong. Please try again later.")
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    async def _owned_servers(self, discord_id: int) -> List[Tuple[str, dict]]:
+        """``(panel, server)`` pairs the member owns across every ready index."""
+        owned = []
+        for name, index in ownership.indexes.items():
+            if not index.ready:
+                continue
+            panel_user_id = await index.panel_user_for(discord_id)
+            if panel_user_id is not None:
+                owned.extend((name, attr) for attr in index.servers_for(panel_user_id))
+        return owned
+
+    async def _owned_server(self, interaction: discord.Interaction, server: str) -> Optional[Tuple[str, dict]]:
+        """Resolve ``server`` (``panel:id`` from autocomplete, or a bare ID/identifier) to an
+        indexed server the invoker owns, replying with an error otherwise."""
+        if not any(index.ready for index in ownership.indexes.values()):
+            await interaction.followup.send(embed=embeds.warn_embed("Not ready", "Server data is still loading. Try again shortly."), ephemeral=True)
+            return None
+        panel, _, ref = server.rpartition(":")
+        candidates = [panel] if panel in ownership.indexes else list(ownership.indexes)
+        for name in candidates:
+            index = ownership.indexes[name]
+            if not index.ready:
+                continue
+            server_id = index.resolve_server(ref)
+            if server_id is None:
+                continue
+            panel_user_id = await index.panel_user_for(interaction.user.id)
+            if panel_user_id is not None and index.owns(panel_user_id, server_id):
+                return name, index.servers[server_id]
+        await interaction.followup.send(embed=embeds.error_embed("Not found", f"You do not own a server {ref}."), ephemeral=True)
+        return None
+
+    @app_commands.command(name="my_servers", description="List the servers you own")
+    @_quota()
+    @app_commands.checks.cooldown(1, SELF_SERVICE_COOLDOWN, key=lambda i: i.user.id)
+    async def my_servers(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        if not any(index.ready for index in ownership.indexes.values()):
+            return await interaction.followup.send(embed=embeds.warn_embed("Not ready", "Server data is still loading. Try again shortly."), ephemeral=True)
+        owned = await self._owned_servers(interaction.user.id)
+        lines = [_server_line(panel, attr) for panel, attr in owned]
+        description = "\n".join(lines[:25]) or "You do not own any servers."
+        await interaction.followup.send(embed=embeds.success_embed("Your servers", description), ephemeral=True)
+
+    @app_commands.command(name="my_server_status", description="Show the status of one of your servers")
+    @app_commands.describe(server="Server ID or identifier")
+    @_quota()
+    @app_commands.checks.cooldown(1, SELF_SERVICE_COOLDOWN, key=lambda i: i.user.id)
+    async def my_server_status(self, interaction: discord.Interaction, server: str):
+        await interaction.response.defer(ephemeral=True)
+        owned = await self._owned_server(interaction, server)
+        if owned is None:
+            return
+        await interaction.followup.send(embed=embeds.success_embed("Server status", _server_line(*owned)), ephemeral=True)
+
+    @app_commands.command(name="my_backups", description="List backups of one of your servers")
+    @app_commands.describe(server="Server ID or identifier")
+    @_quota()
+    @app_commands.checks.cooldown(1, SELF_SERVICE_COOLDOWN, key=lambda i: i.user.id)
+    async def my_backups(self, interaction: discord.Interaction, server: str):
+        await interaction.response.defer(ephemeral=True)
+        owned = await self._owned_server(interaction, server)
+        if owned is None:
+            return
+        panel, attr = owned
+        resp = await client_api.get_client(panel).list_backups(attr.get("identifier"))
+        if resp.get("status") not in (200,):
+            return await interaction.followup.send(embed=embeds.error_embed("Failed to fetch backups", str(resp.get("data"))), ephemeral=True)
+        data = resp.get("data") or {}
+        lines = []
+        if isinstance(data, dict) and data.get("data"):
+            for b in data["data"]:
+                a = b.get("attributes", {})
+                lines.append(f"{a.get('name')} | {a.get('created_at')} | Size: {a.get('bytes')}")
+        description = "\n".join(lines) or "No backups found."
+        await interaction.followup.send(embed=embeds.success_embed(f"Backups for {attr.get('name')}", description), ephemeral=True)
+
+    @my_server_status.autocomplete("server")
+    @my_backups.autocomplete("server")
+    async def _server_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        # Only the prebuilt mapping here: autocomplete must not trigger panel lookups
+        choices = []
+        for name, index in ownership.indexes.items():
+            panel_user_id = index.discord_to_panel.get(interaction.user.id)
+            if panel_user_id is None:
+                continue
+            for attr in index.servers_for(panel_user_id):
+                if current.lower() in (attr.get("name") or "").lower() or current in str(attr.get("identifier")):
+                    label = f"{ptero_api.panel_tag(name)}{attr.get('name')} ({attr.get('identifier')})"
+                    choices.append(app_commands.Choice(name=label[:100], value=f"{name}:{attr.get('id')}"))
+        return choices[:25]
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(SelfService(bot))
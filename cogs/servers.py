@@ -1,22 +1,28 @@
 import os
-from typing import Optional
+import asyncio
+import logging
+from typing import Optional, List, Tuple
 
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from utils import api as ptero_api
 from utils import embeds
-from utils import checks
+from utils import auth
+from utils import plans
+from utils import ownership
+from utils import jobs
+from utils.transformers import PanelName
 
 ADMIN_LOG_CHANNEL_ID = int(os.getenv("ADMIN_LOG_CHANNEL_ID", "0"))
 MAX_RAM = int(os.getenv("MAX_RAM", "32768"))
 MAX_CPU = int(os.getenv("MAX_CPU", "800"))
 MAX_DISK = int(os.getenv("MAX_DISK", "200000"))
+# Seconds a command keeps updating its job status message (interaction tokens last 15 minutes)
+JOB_WAIT_TIMEOUT = int(os.getenv("JOB_WAIT_TIMEOUT", "600"))
 
-
-def _is_admin(interaction: discord.Interaction) -> bool:
-    return checks.is_admin_id(interaction.user.id)
+logger = logging.getLogger("ptero-bot.servers")
 
 
 class Servers(commands.Cog):
@@ -24,6 +30,36 @@ class Servers(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.plans_task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        self.plans_task = asyncio.create_task(self._load_plans())
+        self.retry_plans.start()
+        # Run wherever the job finishes, also after a restart or once the command stopped waiting
+        jobs.queue.on_complete("create_server", self._server_created)
+        jobs.queue.on_complete("delete_server", self._server_deleted)
+
+    async def cog_unload(self):
+        if self.plans_task:
+            self.plans_task.cancel()
+        self.retry_plans.cancel()
+        jobs.queue.completions.pop("create_server", None)
+        jobs.queue.completions.pop("delete_server", None)
+
+    @tasks.loop(seconds=plans.PLAN_RETRY_SECONDS)
+    async def retry_plans(self):
+        # Plans whose egg could not be fetched at startup recover once the panel answers
+        try:
+            await plans.registry.retry_unreachable(MAX_RAM, MAX_CPU, MAX_DISK)
+        except Exception:
+            logger.exception("Failed to recompile server plans")
+
+    async def _load_plans(self):
+        try:
+            await plans.registry.compile(MAX_RAM, MAX_CPU, MAX_DISK, plans.registry.load())
+            logger.info("Loaded %d server plans", len(plans.registry.plans))
+        except Exception:
+            logger.exception("Failed to load server plans from %s", plans.registry.path)
 
     async def _log_admin(self, embed: discord.Embed):
         if ADMIN_LOG_CHANNEL_ID == 0:
@@ -43,6 +79,103 @@ class Servers(commands.Cog):
             except Exception:
                 pass
 
+    async def _track_job(self, interaction: discord.Interaction, job: jobs.Job) -> Tuple[Optional[discord.WebhookMessage], Optional[jobs.Job]]:
+        """Post the job's status and edit it in place until the job finishes or we stop waiting."""
+        message = None
+        async for update in jobs.queue.updates(job.id, timeout=JOB_WAIT_TIMEOUT):
+            job = update
+            embed = embeds.job_embed(job)
+            try:
+                if message is None:
+                    message = await interaction.followup.send(embed=embed, ephemeral=True, wait=True)
+                else:
+                    await message.edit(embed=embed)
+            except discord.HTTPException:
+                logger.warning("Could not update status message for job %s", job.id)
+        if message is not None and job is not None and not job.done:
+            try:
+                await message.edit(embed=embeds.warn_embed("Still running", f"Job #{job.id} is still {job.state}. The user is notified when it finishes; check /job_status."))
+            except discord.HTTPException:
+                pass
+        return message, job
+
+    async def _fetch_user(self, user_id: int) -> Optional[discord.User]:
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user
+        try:
+            return await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            return None
+
+    async def _notify(self, user_id: int, embed: discord.Embed, fallback_text: str) -> bool:
+        user = await self._fetch_user(user_id)
+        if user is None:
+            await self._log_admin(embeds.warn_embed("DM Failure: Could not notify user", f"Discord user {user_id} not found.\nFallback: {fallback_text}"))
+            return False
+        return await self._dm_user_or_log(user, embed, fallback_text=fallback_text)
+
+    # -----------------------
+    # Job completions
+    # -----------------------
+    async def _server_created(self, job: jobs.Job):
+        """DM the owner and log a finished /createserver job."""
+        p = job.payload
+        requester = p.get("requested_by", "Someone")
+        if job.state != jobs.SUCCEEDED:
+            await self._log_admin(embeds.error_embed("Server creation failed", f"{requester} tried to create server {p['name']} for <@{p['discord_id']}> on {p['panel']} (Job #{job.id}): {job.error}"))
+            return
+        if p["panel"] not in ptero_api.panels:
+            logger.warning("Job %s finished on panel %s, which is no longer configured", job.id, p["panel"])
+            return
+        client = ptero_api.get_client(p["panel"])
+        attrs = job.result.get("server") or {}
+        server_id = attrs.get("id")
+        identifier = attrs.get("identifier")
+        if server_id is not None:
+            # Keep self-service ownership lookups current until the next full rebuild
+            ownership.get_index(client.name).add_server(attrs)
+        created_password = None
+        if job.result.get("credentials_pending"):
+            # The job created the panel user; its generated password was never stored, so set one now
+            reset = await client.change_user_password(job.result["panel_user_id"])
+            status = reset.get("status", 0)
+            if status == 0 or status == 429 or status >= 500:
+                # Completions are retried, so try again once the panel answers
+                raise RuntimeError(f"Setting the password of panel user {job.result['panel_user_id']} failed with status {status}")
+            created_password = reset.get("password")
+            if not created_password:
+                await self._log_admin(embeds.warn_embed("Password not set", f"Could not set a password for new panel user {p['username']} (ID {job.result['panel_user_id']}) on {client.name}; use /change_password."))
+
+        dm_embed = embeds.success_embed("✅ SERVER CREATED", f"Server Name: {p['name']}\nServer ID: {server_id or identifier}\nNode: {p['node_id']}\nRAM: {p['ram']} MB\nCPU: {p['cpu']}\nDisk: {p['disk']} MB\nVersion: {p['version']}\nPanel URL: {client.url}")
+        if created_password:
+            dm_embed.add_field(name="Username", value=p["username"], inline=True)
+            dm_embed.add_field(name="Password (new user)", value=created_password, inline=True)
+        dm_sent = await self._notify(p["discord_id"], dm_embed, fallback_text=f"Server {server_id or identifier} created")
+
+        admin_embed = embeds.success_embed("Server Creation", f"{requester} created server {p['name']} for <@{p['discord_id']}> on {client.name} (Server ID: {server_id or identifier}). DM sent: {dm_sent}")
+        await self._log_admin(admin_embed)
+
+    async def _server_deleted(self, job: jobs.Job):
+        """DM the user and log a finished /delete_server job."""
+        p = job.payload
+        server_id = p["server_id"]
+        requester = p.get("requested_by", "Someone")
+        if job.state != jobs.SUCCEEDED:
+            await self._log_admin(embeds.error_embed("Server deletion failed", f"{requester} tried to delete server {server_id} on {p['panel']} (Job #{job.id}): {job.error}"))
+            return
+        if p["panel"] in ptero_api.panels:
+            index = ownership.get_index(p["panel"])
+            resolved = index.resolve_server(server_id)
+            if resolved is not None:
+                index.remove_server(resolved)
+        dm_sent = False
+        if p.get("notify_id"):
+            dm_embed = embeds.error_embed("❌ SERVER DELETED", f"Server ID: {server_id}\nDeleted By: {requester}\nDate & Time: {discord.utils.utcnow().isoformat()}")
+            dm_sent = await self._notify(p["notify_id"], dm_embed, fallback_text=f"Server {server_id} deleted by {requester}")
+        admin_embed = embeds.warn_embed("Server Deleted", f"{requester} deleted server {server_id} on {p['panel']} for <@{p.get('notify_id')}>. DM sent: {dm_sent}")
+        await self._log_admin(admin_embed)
+
     async def _dm_user_or_log(self, member: discord.User, embed: discord.Embed, fallback_text: Optional[str] = None):
         """Try to DM; on failure, log to admin channel with details."""
         try:
@@ -64,151 +197,158 @@ class Servers(commands.Cog):
     @app_commands.command(name="createserver", description="Create a new server on the panel")
     @app_commands.describe(
         name="Server name",
+        node_id="Node ID to create the server on",
+        user="Discord user who will own the created server",
+        plan="Named server plan (overrides ram/cpu/disk/version/egg_id)",
         ram="RAM in MB",
         cpu="CPU units (integer)",
         disk="Disk in MB",
         version="Server startup/version string",
-        node_id="Node ID to create the server on",
         egg_id="Egg ID to use",
-        user="Discord user who will own the created server"
+        panel="Panel to create the server on (defaults to the plan's panel, then the default panel)"
     )
+    @auth.require("servers")
     async def createserver(
         self,
         interaction: discord.Interaction,
         name: str,
-        ram: int,
-        cpu: int,
-        disk: int,
-        version: str,
         node_id: int,
-        egg_id: int,
-        user: discord.User
+        user: discord.User,
+        plan: Optional[str] = None,
+        ram: Optional[int] = None,
+        cpu: Optional[int] = None,
+        disk: Optional[int] = None,
+        version: Optional[str] = None,
+        egg_id: Optional[int] = None,
+        panel: Optional[PanelName] = None
     ):
         await interaction.response.defer(ephemeral=True)
-        if not _is_admin(interaction):
-            return await interaction.followup.send(embed=embeds.error_embed("Permission denied", "You are not allowed to use this command."), ephemeral=True)
-
-        # Validate resources
-        if ram <= 0 or cpu <= 0 or disk <= 0:
-            return await interaction.followup.send(embed=embeds.error_embed("Invalid resources", "RAM/CPU/Disk must be positive integers."), ephemeral=True)
-        if ram > MAX_RAM or cpu > MAX_CPU or disk > MAX_DISK:
-            return await interaction.followup.send(
-                embed=embeds.error_embed(
-                    "Resource limits exceeded",
-                    f"Requested resources exceed allowed maxima (MAX_RAM={MAX_RAM}, MAX_CPU={MAX_CPU}, MAX_DISK={MAX_DISK})."
-                ),
-                ephemeral=True
-            )
-
-        # Validate node and egg
-        node = await ptero_api.get_node(node_id)
-        if node.get("status") not in (200,):
-            return await interaction.followup.send(embed=embeds.error_embed("Invalid node", f"Node {node_id} not found or unreachable."), ephemeral=True)
-        egg = await ptero_api.get_egg(egg_id)
-        if egg.get("status") not in (200,):
-            return await interaction.followup.send(embed=embeds.error_embed("Invalid egg", f"Egg {egg_id} not found or unreachable."), ephemeral=True)
-
-        # Ensure panel user exists or create
-        panel_email = f"{user.id}@discord.local"
+        server_plan = None
+        if plan:
+            # Plans are validated when compiled, so this is only a lookup
+            server_plan = plans.registry.get(plan)
+            if server_plan is None:
+                return await interaction.followup.send(embed=embeds.error_embed("Unknown plan", f"No plan named {plan}."), ephemeral=True)
+            if not server_plan.ok:
+                return await interaction.followup.send(embed=embeds.error_embed("Invalid plan", f"Plan {plan} failed validation: {server_plan.error}"), ephemeral=True)
+            if panel and panel != server_plan.panel:
+                return await interaction.followup.send(embed=embeds.error_embed("Wrong panel", f"Plan {plan} belongs to panel {server_plan.panel}."), ephemeral=True)
+            panel = server_plan.panel
+            limits = server_plan.payload["limits"]
+            ram, cpu, disk = limits["memory"], limits["cpu"], limits["disk"]
+            version = f"plan {plan}"
+        client = ptero_api.get_client(panel)
+        if server_plan is None:
+            if None in (ram, cpu, disk, version, egg_id):
+                return await interaction.followup.send(embed=embeds.error_embed("Missing arguments", "Provide a plan, or ram, cpu, disk, version and egg_id."), ephemeral=True)
+
+            # Validate resources
+            if ram <= 0 or cpu <= 0 or disk <= 0:
+                return await interaction.followup.send(embed=embeds.error_embed("Invalid resources", "RAM/CPU/Disk must be positive integers."), ephemeral=True)
+            if ram > MAX_RAM or cpu > MAX_CPU or disk > MAX_DISK:
+                return await interaction.followup.send(
+                    embed=embeds.error_embed(
+                        "Resource limits exceeded",
+                        f"Requested resources exceed allowed maxima (MAX_RAM={MAX_RAM}, MAX_CPU={MAX_CPU}, MAX_DISK={MAX_DISK})."
+                    ),
+                    ephemeral=True
+                )
+
+            # Validate node and egg
+            node = await client.get_node(node_id)
+            if node.get("status") not in (200,):
+                return await interaction.followup.send(embed=embeds.error_embed("Invalid node", f"Node {node_id} not found or unreachable."), ephemeral=True)
+            egg = await client.get_egg(egg_id)
+            if egg.get("status") not in (200,):
+                return await interaction.followup.send(embed=embeds.error_embed("Invalid egg", f"Egg {egg_id} not found or unreachable."), ephemeral=True)
+
+        # Record the mutation before touching the panel; the worker resolves or
+        # creates the panel user and creates the server idempotently
         panel_username = f"{user.name}".replace(" ", "_")[:32]
+        job = await jobs.queue.enqueue("create_server", f"createserver:{interaction.id}", {
+            "name": name,
+            "node_id": node_id,
+            "discord_id": user.id,
+            "username": panel_username,
+            "first_name": user.name,
+            "plan": plan,
+            "egg_id": egg_id,
+            "ram": ram,
+            "cpu": cpu,
+            "disk": disk,
+            "version": version,
+            "panel": client.name,
+            "requested_by": str(interaction.user),
+        })
+        message, job = await self._track_job(interaction, job)
+        if message is None or job is None or not job.done:
+            return
+        if job.state != jobs.SUCCEEDED:
+            return await message.edit(embed=embeds.error_embed("Server creation failed", job.error or "Unknown error"))
+        attrs = job.result.get("server") or {}
+        return await message.edit(embed=embeds.success_embed("Server created", f"Server {attrs.get('id') or attrs.get('identifier')} created for {user.mention}. They get a DM with the details.", footer=f"Job #{job.id}"))
+
+    @createserver.autocomplete("plan")
+    async def _plan_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in plans.registry.names()
+            if current.lower() in name.lower()
+        ][:25]
 
-        found = await ptero_api.find_user_by_email(panel_email)
-        created_password = None
-        panel_user_id = None
-
-        if found:
-            # Try to get ID from possible response shapes
-            panel_user_id = found.get("id") or found.get("attributes", {}).get("id")
-        else:
-            # Create user
-            create_resp = await ptero_api.create_user(email=panel_email, username=panel_username, first_name=user.name, last_name="", password=None)
-            if create_resp.get("status") not in (201, 200):
-                desc = create_resp.get("data") or "Unknown error creating panel user."
-                return await interaction.followup.send(embed=embeds.error_embed("Failed to create panel user", str(desc)), ephemeral=True)
-            data = create_resp.get("data", {})
-            # extract id
-            panel_user_id = data.get("attributes", {}).get("id") or data.get("id")
-            created_password = create_resp.get("password")
-
-        if not panel_user_id:
-            return await interaction.followup.send(embed=embeds.error_embed("User resolution error", "Could not determine panel user ID."), ephemeral=True)
-
-        # Create server
-        server_resp = await ptero_api.create_server(
-            name=name,
-            user_id=int(panel_user_id),
-            node_id=node_id,
-            egg_id=egg_id,
-            ram=ram,
-            cpu=cpu,
-            disk=disk,
-            version=version,
-            startup=version
-        )
-
-        if server_resp.get("status") not in (201, 200):
-            return await interaction.followup.send(embed=embeds.error_embed("Server creation failed", str(server_resp.get("data"))), ephemeral=True)
-
-        server_data = server_resp.get("data", {})
-        # extract server id and identifier if present
-        server_id = None
-        identifier = None
-        if isinstance(server_data, dict):
-            if "attributes" in server_data:
-                server_id = server_data["attributes"].get("id")
-                identifier = server_data["attributes"].get("identifier")
-            elif "data" in server_data and isinstance(server_data["data"], dict):
-                attr = server_data["data"].get("attributes", {})
-                server_id = attr.get("id") or server_data["data"].get("id")
-                identifier = attr.get("identifier")
-
-        # Send DM to user
-        dm_embed = embeds.success_embed("✅ SERVER CREATED", f"Server Name: {name}\nServer ID: {server_id or identifier}\nNode: {node_id}\nRAM: {ram} MB\nCPU: {cpu}\nDisk: {disk} MB\nVersion: {version}\nPanel URL: {ptero_api.PANEL_URL}")
-        if created_password:
-            dm_embed.add_field(name="Username", value=panel_username, inline=True)
-            dm_embed.add_field(name="Password (new user)", value=created_password, inline=True)
-
-        dm_sent = await self._dm_user_or_log(user, dm_embed, fallback_text=f"Server {server_id or identifier} created")
-
-        # Log to admin channel
-        admin_embed = embeds.success_embed("Server Creation", f"{interaction.user} created server {name} for {user} (Server ID: {server_id or identifier})")
-        await self._log_admin(admin_embed)
+    # -----------------------
+    # /plans
+    # -----------------------
+    @app_commands.command(name="plans", description="List configured server plans")
+    async def list_plans(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        lines = [plans.registry.plans[name].summary() for name in plans.registry.names()]
+        description = "\n".join(lines) or f"No plans configured (see {plans.registry.path})."
+        await interaction.followup.send(embed=embeds.success_embed("Server plans", description), ephemeral=True)
 
-        return await interaction.followup.send(embed=embeds.success_embed("Server created", f"Server created for {user.mention}. DM sent: {dm_sent}"), ephemeral=True)
+    @app_commands.command(name="plans_reload", description="Reload and recompile server plans")
+    @auth.require("servers")
+    async def plans_reload(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        await self._load_plans()
+        invalid = [p.name for p in plans.registry.plans.values() if not p.ok]
+        description = f"Loaded {len(plans.registry.plans)} plans."
+        if invalid:
+            description += f"\nInvalid: {', '.join(invalid)}"
+        await interaction.followup.send(embed=embeds.success_embed("Plans reloaded", description), ephemeral=True)
 
     # -----------------------
     # /delete_server
     # -----------------------
     @app_commands.command(name="delete_server", description="Delete a server by ID")
-    @app_commands.describe(server_id="Server ID or UUID", user="Discord user to notify")
-    async def delete_server(self, interaction: discord.Interaction, server_id: str, user: discord.User):
+    @app_commands.describe(server_id="Server ID or UUID", user="Discord user to notify", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("servers")
+    async def delete_server(self, interaction: discord.Interaction, server_id: str, user: discord.User, panel: Optional[PanelName] = None):
         await interaction.response.defer(ephemeral=True)
-        if not _is_admin(interaction):
-            return await interaction.followup.send(embed=embeds.error_embed("Permission denied", "You are not allowed to use this command."), ephemeral=True)
-
-        resp = await ptero_api.delete_server(server_id)
-        if resp.get("status") in (204, 200):
-            # DM user
-            dm_embed = embeds.error_embed("❌ SERVER DELETED", f"Server ID: {server_id}\nDeleted By: {interaction.user}\nDate & Time: {discord.utils.utcnow().isoformat()}")
-            dm_sent = await self._dm_user_or_log(user, dm_embed, fallback_text=f"Server {server_id} deleted by {interaction.user}")
-            # Log
-            admin_embed = embeds.warn_embed("Server Deleted", f"{interaction.user} deleted server {server_id} for {user}. DM sent: {dm_sent}")
-            await self._log_admin(admin_embed)
-            return await interaction.followup.send(embed=embeds.success_embed("Server deleted", f"Server {server_id} deleted. User notified: {dm_sent}"), ephemeral=True)
+        panel = panel or ptero_api.DEFAULT_PANEL
+        job = await jobs.queue.enqueue("delete_server", f"delete_server:{panel}:{server_id}", {
+            "server_id": server_id,
+            "panel": panel,
+            "notify_id": user.id,
+            "requested_by": str(interaction.user),
+        })
+        message, job = await self._track_job(interaction, job)
+        if message is None or job is None or not job.done:
+            return
+        if job.state == jobs.SUCCEEDED:
+            return await message.edit(embed=embeds.success_embed("Server deleted", f"Server {server_id} deleted. {user.mention} gets a DM.", footer=f"Job #{job.id}"))
         else:
-            return await interaction.followup.send(embed=embeds.error_embed("Delete failed", str(resp.get("data"))), ephemeral=True)
+            return await message.edit(embed=embeds.error_embed("Delete failed", job.error or "Unknown error"))
 
     # -----------------------
     # /suspend
     # -----------------------
     @app_commands.command(name="suspend", description="Suspend a server by ID")
-    @app_commands.describe(server_id="Server ID or UUID", user="Discord user to notify", reason="Optional reason")
-    async def suspend(self, interaction: discord.Interaction, server_id: str, user: discord.User, reason: Optional[str] = None):
+    @app_commands.describe(server_id="Server ID or UUID", user="Discord user to notify", reason="Optional reason", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("servers")
+    async def suspend(self, interaction: discord.Interaction, server_id: str, user: discord.User, reason: Optional[str] = None, panel: Optional[PanelName] = None):
         await interaction.response.defer(ephemeral=True)
-        if not _is_admin(interaction):
-            return await interaction.followup.send(embed=embeds.error_embed("Permission denied", "You are not allowed to use this command."), ephemeral=True)
-
-        resp = await ptero_api.suspend_server(server_id)
+        resp = await ptero_api.get_client(panel).suspend_server(server_id)
         if resp.get("status") in (200,):
             dm_embed = embeds.warn_embed("⚠️ SERVER SUSPENDED", f"Server ID: {server_id}\nReason: {reason or 'No reason provided'}")
             dm_sent = await self._dm_user_or_log(user, dm_embed, fallback_text=f"Server {server_id} suspended")
@@ -222,13 +362,11 @@ class Servers(commands.Cog):
     # /unsuspend
     # -----------------------
     @app_commands.command(name="unsuspend", description="Unsuspend a server by ID")
-    @app_commands.describe(server_id="Server ID or UUID", user="Discord user to notify")
-    async def unsuspend(self, interaction: discord.Interaction, server_id: str, user: discord.User):
+    @app_commands.describe(server_id="Server ID or UUID", user="Discord user to notify", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("servers")
+    async def unsuspend(self, interaction: discord.Interaction, server_id: str, user: discord.User, panel: Optional[PanelName] = None):
         await interaction.response.defer(ephemeral=True)
-        if not _is_admin(interaction):
-            return await interaction.followup.send(embed=embeds.error_embed("Permission denied", "You are not allowed to use this command."), ephemeral=True)
-
-        resp = await ptero_api.unsuspend_server(server_id)
+        resp = await ptero_api.get_client(panel).unsuspend_server(server_id)
         if resp.get("status") in (200,):
             dm_embed = embeds.success_embed("✅ SERVER UNSUSPENDED", f"Server ID: {server_id}")
             dm_sent = await self._dm_user_or_log(user, dm_embed, fallback_text=f"Server {server_id} unsuspended")
@@ -242,12 +380,10 @@ class Servers(commands.Cog):
     # /set_resources
     # -----------------------
     @app_commands.command(name="set_resources", description="Change server resources (memory/cpu/disk)")
-    @app_commands.describe(server_id="Server ID or UUID", memory="Memory in MB", cpu="CPU units", disk="Disk in MB", user="User to notify")
-    async def set_resources(self, interaction: discord.Interaction, server_id: str, memory: Optional[int], cpu: Optional[int], disk: Optional[int], user: discord.User):
+    @app_commands.describe(server_id="Server ID or UUID", memory="Memory in MB", cpu="CPU units", disk="Disk in MB", user="User to notify", panel="Panel the server is on (default panel if omitted)")
+    @auth.require("servers")
+    async def set_resources(self, interaction: discord.Interaction, server_id: str, memory: Optional[int], cpu: Optional[int], disk: Optional[int], user: discord.User, panel: Optional[PanelName] = None):
         await interaction.response.defer(ephemeral=True)
-        if not _is_admin(interaction):
-            return await interaction.followup.send(embed=embeds.error_embed("Permission denied", "You are not allowed to use this command."), ephemeral=True)
-
         # Validate limits
         if memory is not None and (memory <= 0 or memory > MAX_RAM):
             return await interaction.followup.send(embed=embeds.error_embed("Memory limit error", f"Memory must be 1..{MAX_RAM} MB"), ephemeral=True)
@@ -256,7 +392,7 @@ class Servers(commands.Cog):
         if disk is not None and (disk <= 0 or disk > MAX_DISK):
             return await interaction.followup.send(embed=embeds.error_embed("Disk limit error", f"Disk must be 1..{MAX_DISK} MB"), ephemeral=True)
 
-        resp = await ptero_api.set_server_resources(server_id, memory=memory, cpu=cpu, disk=disk)
+        resp = await ptero_api.get_client(panel).set_server_resources(server_id, memory=memory, cpu=cpu, disk=disk)
         if resp.get("status") in (200,):
             details = f"Memory: {memory if memory is not None else 'unchanged'} MB\nCPU: {cpu if cpu is not None else 'unchanged'}\nDisk: {disk if disk is not None else 'unchanged'}"
             dm_embed = embeds.success_embed("✅ RESOURCES UPDATED", f"Server ID: {server_id}\n{details}")
@@ -270,35 +406,28 @@ class Servers(commands.Cog):
     # -----------------------
     # /list_servers
     # -----------------------
-    @app_commands.command(name="list_servers", description="List servers on the panel")
-    async def list_servers(self, interaction: discord.Interaction):
+    @app_commands.command(name="list_servers", description="List servers (every panel by default)")
+    @app_commands.describe(panel="Only this panel (all panels if omitted)")
+    async def list_servers(self, interaction: discord.Interaction, panel: Optional[PanelName] = None):
         await interaction.response.defer(ephemeral=True)
-        resp = await ptero_api.list_servers()
-        if resp.get("status") not in (200,):
-            return await interaction.followup.send(embed=embeds.error_embed("Failed to list servers", str(resp.get("data"))), ephemeral=True)
-        data = resp.get("data") or {}
-        items = []
-        # Attempt to parse common response shapes
-        if isinstance(data, dict) and data.get("data"):
-            for item in data["data"]:
-                attr = item.get("attributes", {})
-                items.append(f"{attr.get('name')} (ID: {attr.get('id')}) Owner: {attr.get('user')}")
-        elif isinstance(data, list):
-            for s in data:
-                items.append(str(s))
-        else:
-            items.append(str(data))
+        results = await ptero_api.fan_out(lambda c: c.list_servers(), [panel] if panel else None)
+        if not any(resp.get("status") == 200 for _, resp in results):
+            return await interaction.followup.send(embed=embeds.error_embed("Failed to list servers", str(results[0][1].get("data"))), ephemeral=True)
+        items = [
+            f"{ptero_api.panel_tag(panel)}{attr.get('name')} (ID: {attr.get('id')}) Owner: {attr.get('user')}"
+            for panel, attr in ptero_api.merged_attributes(results)
+        ]
         description = "\n".join(items[:25]) or "No servers found."
-        await interaction.followup.send(embed=embeds.success_embed("Servers", description), ephemeral=True)
+        await interaction.followup.send(embed=embeds.success_embed("Servers", description, footer=embeds.fan_out_footer(results)), ephemeral=True)
 
     # -----------------------
     # /server_info
     # -----------------------
     @app_commands.command(name="server_info", description="Get info for a server")
-    @app_commands.describe(server_id="Server ID or UUID")
-    async def server_info(self, interaction: discord.Interaction, server_id: str):
+    @app_commands.describe(server_id="Server ID or UUID", panel="Panel the server is on (default panel if omitted)")
+    async def server_info(self, interaction: discord.Interaction, server_id: str, panel: Optional[PanelName] = None):
         await interaction.response.defer(ephemeral=True)
-        resp = await ptero_api.get_server(server_id)
+        resp = await ptero_api.get_client(panel).get_server(server_id)
         if resp.get("status") not in (200,):
             return await interaction.followup.send(embed=embeds.error_embed("Failed to fetch server", str(resp.get("data"))), ephemeral=True)
         data = resp.get("data") or {}
@@ -312,31 +441,27 @@ class Servers(commands.Cog):
         for k in ("name", "identifier", "uuid", "node", "memory", "disk", "cpu"):
             if k in attr:
                 desc_lines.append(f"{k}: {attr.get(k)}")
-        await interaction.followup.send(embed=embeds.success_embed("Server Info", "\n".join(desc_lines)), ephemeral=True)
+        await interaction.followup.send(embed=embeds.success_embed("Server Info", "\n".join(desc_lines), footer=embeds.stale_footer(resp)), ephemeral=True)
 
     # -----------------------
     # /server_search
     # -----------------------
     @app_commands.command(name="server_search", description="Search servers by name or owner")
-    @app_commands.describe(query="Search query (name or owner)")
-    async def server_search(self, interaction: discord.Interaction, query: str):
+    @app_commands.describe(query="Search query (name or owner)", panel="Only this panel (all panels if omitted)")
+    async def server_search(self, interaction: discord.Interaction, query: str, panel: Optional[PanelName] = None):
         await interaction.response.defer(ephemeral=True)
-        # Naive search: fetch list and filter
-        resp = await ptero_api.list_servers()
-        if resp.get("status") not in (200,):
-            return await interaction.followup.send(embed=embeds.error_embed("Search failed", str(resp.get("data"))), ephemeral=True)
-        data = resp.get("data") or {}
+        # Naive search: fetch the first page from every panel (or the given one) and filter
+        results = await ptero_api.fan_out(lambda c: c.list_servers(), [panel] if panel else None)
+        if not any(resp.get("status") == 200 for _, resp in results):
+            return await interaction.followup.send(embed=embeds.error_embed("Search failed", str(results[0][1].get("data"))), ephemeral=True)
         matches = []
-        if isinstance(data, dict) and data.get("data"):
-            for item in data["data"]:
-                attr = item.get("attributes", {})
-                name = attr.get("name", "")
-                owner = str(attr.get("user", ""))
-                if query.lower() in name.lower() or query in str(owner):
-                    matches.append(f"{name} (ID: {attr.get('id')}) Owner: {owner}")
+        for panel, attr in ptero_api.merged_attributes(results):
+            name = attr.get("name", "")
+            owner = str(attr.get("user", ""))
+            if query.lower() in name.lower() or query in str(owner):
+                matches.append(f"{ptero_api.panel_tag(panel)}{name} (ID: {attr.get('id')}) Owner: {owner}")
         description = "\n".join(matches[:25]) or "No matches found."
-        await interaction.followup.send(embed=embeds.success_embed("Search results", description), ephemeral=True)
-
+        await interaction.followup.send(embed=embeds.success_embed("Search results", description, footer=embeds.fan_out_footer(results)), ephemeral=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Servers(bot))
@@ -0,0 +1,124 @@
+import time
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from utils.coordination import RedisBackend
+
+
+class FakeRedis:
+    """In-process stand-in for a Redis server, enough for RedisBackend.
+
+    Speaks RESP over a real socket and implements AUTH, SELECT, GET, SET
+    (with NX/PX), DEL and EVAL of the backend's ACQUIRE and RELEASE scripts.
+    Set ``drop_next`` to close the connection instead of answering the next
+    command, to exercise reconnects, and ``blackhole`` to stop answering at all.
+    """
+
+    def __init__(self, password: Optional[str] = None):
+        self.password = password
+        self.data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self.commands: List[List[str]] = []
+        self.drop_next = False
+        self.blackhole = False
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+
+    async def start(self) -> "FakeRedis":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{self.port}/0"
+
+    def _get(self, key: str) -> Optional[str]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _set(self, key: str, value: str, px: Optional[int]) -> None:
+        self.data[key] = (value, time.monotonic() + px / 1000 if px else None)
+
+    def _eval(self, script: str, keys: List[str], args: List[str]):
+        key = keys[0]
+        if script == RedisBackend.ACQUIRE:
+            if self._get(key) == args[0]:
+                self._set(key, args[0], int(args[1]))
+                return 1
+            if self._get(key) is None:
+                self._set(key, args[0], int(args[1]))
+                return 1
+            return 0
+        if script == RedisBackend.RELEASE:
+            if self._get(key) == args[0]:
+                del self.data[key]
+                return 1
+            return 0
+        raise ValueError("unknown script")
+
+    def _command(self, args: List[str], authed: bool):
+        name = args[0].upper()
+        if name == "AUTH":
+            return (b"+OK\r\n", True) if args[1] == self.password else (b"-ERR invalid password\r\n", False)
+        if self.password and not authed:
+            return b"-NOAUTH Authentication required.\r\n", False
+        if name == "SELECT":
+            return b"+OK\r\n", authed
+        if name == "GET":
+            value = self._get(args[1])
+            return (b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value.encode()), value.encode())), authed
+        if name == "SET":
+            options = [a.upper() for a in args[3:]]
+            px = int(args[3 + options.index("PX") + 1]) if "PX" in options else None
+            if "NX" in options and self._get(args[1]) is not None:
+                return b"$-1\r\n", authed
+            self._set(args[1], args[2], px)
+            return b"+OK\r\n", authed
+        if name == "DEL":
+            existed = self._get(args[1]) is not None
+            self.data.pop(args[1], None)
+            return b":%d\r\n" % existed, authed
+        if name == "EVAL":
+            count = int(args[2])
+            return b":%d\r\n" % self._eval(args[1], args[3:3 + count], args[3 + count:]), authed
+        return b"-ERR unknown command\r\n", authed
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[str]]:
+        header = await reader.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:-2])):
+            size = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(size + 2))[:-2].decode())
+        return args
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        authed = False
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if self.drop_next:
+                    self.drop_next = False
+                    break
+                if self.blackhole:
+                    continue
+                self.commands.append(args)
+                reply, authed = self._command(args, authed)
+                writer.write(reply)
+                await writer.drain()
+        finally:
+            writer.close()
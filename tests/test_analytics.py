@@ -0,0 +1,49 @@
+import os
+
+from utils.analytics import SnapshotStore, CHANGE_COLUMNS
+
+
+def _servers(*ids, panel="main"):
+    return {panel: [{"id": i, "node": 1, "user": i % 3, "limits": {"memory": 100, "cpu": 50, "disk": 1000}} for i in ids]}
+
+
+HISTORY = [
+    (1, 2, 3),
+    (1, 2, 3, 4),      # 4 created
+    (1, 3, 4, 5),      # 2 deleted, 5 created
+    (1, 3, 4, 5),
+    (3, 4, 6),         # 1 and 5 deleted, 6 created
+]
+
+
+def _fill(store: SnapshotStore) -> None:
+    for hour, ids in enumerate(HISTORY):
+        store.append(hour * 3600, _servers(*ids), {"main": [{"id": 1, "memory": 4096, "disk": 10000}]})
+
+
+def test_created_and_deleted(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    _fill(store)
+    report = store.report(0)
+    assert (report.created, report.deleted) == (3, 3)
+    assert report.totals_start == [3, 300, 150, 3000]
+    assert report.totals_end == [3, 300, 150, 3000]
+    # The window's first snapshot is the baseline
+    report = store.report(2 * 3600)
+    assert (report.created, report.deleted) == (1, 2)
+    report = store.report(4 * 3600)
+    assert (report.created, report.deleted) == (0, 0)
+
+
+def test_uncommitted_append_is_dropped(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    _fill(store)
+    # A crash after the counts were written but before the timestamp
+    for column in CHANGE_COLUMNS:
+        with open(os.path.join(str(tmp_path), f"snapshots.{column}.bin"), "ab") as fh:
+            fh.write(b"\x07" * 8)
+    fresh = SnapshotStore(str(tmp_path))
+    assert (fresh.report(0).created, fresh.report(0).deleted) == (3, 3)
+    fresh.append(5 * 3600, _servers(3, 4, 6), {})
+    assert len(fresh.changes["created"]) == len(fresh.timestamps) == 6
+    assert SnapshotStore(str(tmp_path)).report(0).created == 3
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("dotenv")
+
+from utils import auth  # noqa: E402
+
+
+def _reload(monkeypatch, dotenv, environ, dotenv_keys):
+    monkeypatch.setattr(auth, "dotenv_values", lambda: dotenv)
+    monkeypatch.setattr(auth, "_DOTENV_KEYS", frozenset(dotenv_keys))
+    for key in auth.AUTH_VARIABLES:
+        monkeypatch.delenv(key, raising=False)
+    for key, value in environ.items():
+        monkeypatch.setenv(key, value)
+    return auth.reload()
+
+
+def test_dotenv_wins_over_environment(monkeypatch):
+    updated = _reload(monkeypatch, {"ADMIN_IDS": "1"}, {"ADMIN_IDS": "2"}, ())
+    assert updated.admin_ids == {1}
+
+
+def test_deleted_dotenv_key_is_revoked(monkeypatch):
+    # load_dotenv copied these into os.environ at startup
+    environ = {"ADMIN_IDS": "1", "PERMISSION_SCOPES": "power:5"}
+    updated = _reload(monkeypatch, {"ADMIN_IDS": "1"}, environ, ("ADMIN_IDS", "PERMISSION_SCOPES"))
+    assert updated.admin_ids == {1}
+    assert updated.scopes == {}
+
+
+def test_real_environment_is_kept(monkeypatch):
+    updated = _reload(monkeypatch, {}, {"ADMIN_ROLE_IDS": "7"}, ())
+    assert updated.admin_role_ids == {7}
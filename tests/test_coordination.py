@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from utils.coordination import Backend, MemoryBackend, SQLiteBackend, RedisBackend, Coordinator
+from fake_redis import FakeRedis
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _ownership(backend: Backend) -> None:
+    assert await backend.acquire("lock", "a", ttl=0.2)
+    assert not await backend.acquire("lock", "b", ttl=0.2)
+    # The owner renews its hold
+    assert await backend.acquire("lock", "a", ttl=0.2)
+    assert not await backend.release("lock", "b")
+    assert await backend.get("lock") == "a"
+    assert await backend.release("lock", "a")
+    assert await backend.get("lock") is None
+    assert await backend.acquire("lock", "b", ttl=0.1)
+    await asyncio.sleep(0.15)
+    # An expired hold can be taken over
+    assert await backend.acquire("lock", "a", ttl=0.2)
+    assert not await backend.release("lock", "b")
+
+
+async def _values(backend: Backend) -> None:
+    await backend.set("plain", "1")
+    await backend.set("short", "2", ttl=0.1)
+    assert await backend.get("plain") == "1"
+    assert await backend.get("short") == "2"
+    await asyncio.sleep(0.15)
+    assert await backend.get("short") is None
+    await backend.delete("plain")
+    assert await backend.get("plain") is None
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        Backend()
+
+
+def test_memory_backend():
+    async def main():
+        backend = MemoryBackend()
+        await _ownership(backend)
+        await _values(backend)
+    run(main())
+
+
+def test_sqlite_backend(tmp_path):
+    async def main():
+        path = str(tmp_path / "coordination.db")
+        backend = SQLiteBackend(path)
+        await _ownership(backend)
+        await _values(backend)
+        # A second process sees the same holds
+        other = SQLiteBackend(path)
+        assert await backend.acquire("shared", "a", ttl=5)
+        assert not await other.acquire("shared", "b", ttl=5)
+        await backend.close()
+        await other.close()
+    run(main())
+
+
+def test_redis_backend_scripts():
+    async def main():
+        server = await FakeRedis(password="secret").start()
+        backend = RedisBackend(server.url)
+        try:
+            await _ownership(backend)
+            await _values(backend)
+            assert server.commands[0] == ["AUTH", "secret"]
+            assert any(c[0] == "EVAL" and c[1] == RedisBackend.ACQUIRE for c in server.commands)
+            assert any(c[0] == "EVAL" and c[1] == RedisBackend.RELEASE for c in server.commands)
+        finally:
+            await backend.close()
+            await server.stop()
+    run(main())
+
+
+def test_redis_backend_reconnects():
+    async def main():
+        server = await FakeRedis().start()
+        backend = RedisBackend(server.url)
+        try:
+            await backend.set("key", "value")
+            server.drop_next = True
+            assert await backend.get("key") == "value"
+        finally:
+            await backend.close()
+            await server.stop()
+    run(main())
+
+
+def test_leader_failover():
+    async def main():
+        backend = MemoryBackend()
+        first = Coordinator(backend, instance_id="one", leader_ttl=0.3)
+        second = Coordinator(backend, instance_id="two", leader_ttl=0.3)
+        await first.start()
+        await second.start()
+        assert first.is_leader and not second.is_leader
+        assert await second.leader() == "one"
+        await first.stop()
+        await asyncio.sleep(0.3)
+        assert second.is_leader
+        await second.stop()
+    run(main())
+
+
+def test_reserve_and_lock():
+    async def main():
+        coordinator = Coordinator(MemoryBackend(), instance_id="one")
+        token = await coordinator.reserve("allocation:1", ttl=5)
+        assert token is not None
+        assert await coordinator.reserve("allocation:1", ttl=5) is None
+        await coordinator.release("allocation:1", token)
+        assert await coordinator.reserve("allocation:1", ttl=5) is not None
+
+        order = []
+
+        async def worker(name):
+            async with coordinator.lock("build", ttl=5, poll=0.01):
+                order.append(f"{name} in")
+                await asyncio.sleep(0.05)
+                order.append(f"{name} out")
+
+        await asyncio.gather(worker("a"), worker("b"))
+        assert order in (["a in", "a out", "b in", "b out"], ["b in", "b out", "a in", "a out"])
+    run(main())
+
+
+def test_redis_backend_times_out():
+    async def main():
+        server = await FakeRedis().start()
+        backend = RedisBackend(server.url, timeout=0.1)
+        try:
+            await backend.set("key", "value")
+            server.blackhole = True
+            with pytest.raises(asyncio.TimeoutError):
+                await backend.get("key")
+            # The connection that timed out is not reused
+            server.blackhole = False
+            assert await backend.get("key") == "value"
+        finally:
+            await backend.close()
+            await server.stop()
+    run(main())
+
+
+def test_leadership_lapses_when_renewal_hangs():
+    async def main():
+        server = await FakeRedis().start()
+        coordinator = Coordinator(RedisBackend(server.url, timeout=5), instance_id="one", leader_ttl=0.3)
+        try:
+            await coordinator.start()
+            assert coordinator.is_leader
+            server.blackhole = True
+            # The renewal hangs longer than the lease, so the lease must lapse on its own
+            await asyncio.sleep(0.45)
+            assert not coordinator.is_leader
+        finally:
+            server.blackhole = False
+            await coordinator.stop()
+            await server.stop()
+    run(main())
@@ -0,0 +1,309 @@
+import time
+import asyncio
+import sqlite3
+
+from utils.jobs import JobQueue, PermanentError, DeferredError, RetryableError, PENDING, RUNNING, SUCCEEDED, FAILED
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _wait_done(queue: JobQueue, job_id: int, timeout: float = 5) -> None:
+    async for job in queue.updates(job_id, timeout=timeout):
+        if job.done:
+            return
+
+
+def _queues(path: str, count: int = 2, **kwargs):
+    kwargs.setdefault("retry_delay", 0.05)
+    kwargs.setdefault("lease", 5)
+    return [JobQueue(path, **kwargs) for _ in range(count)]
+
+
+def test_each_job_runs_once_across_processes(tmp_path):
+    async def main():
+        queues = _queues(str(tmp_path / "jobs.db"), workers=3)
+        calls = []
+
+        async def handler(job):
+            calls.append(job.payload["n"])
+            await asyncio.sleep(0.01)
+            return {"n": job.payload["n"]}
+
+        for queue in queues:
+            queue.register("count", handler)
+            await queue.start()
+        try:
+            jobs = [await queues[i % 2].enqueue("count", f"job-{i}", {"n": i}) for i in range(20)]
+            for job in jobs:
+                await _wait_done(queues[0], job.id)
+            assert sorted(calls) == list(range(20))
+            for job in jobs:
+                done = await queues[1].get(job.id)
+                assert done.state == SUCCEEDED and done.attempts == 1 and done.result == {"n": job.payload["n"]}
+        finally:
+            for queue in queues:
+                await queue.stop()
+    run(main())
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    async def main():
+        queue = JobQueue(str(tmp_path / "jobs.db"), retry_delay=0.05)
+        calls = []
+
+        async def handler(job):
+            calls.append(job.id)
+            raise PermanentError("nope")
+
+        queue.register("fail", handler)
+        await queue.start()
+        try:
+            first = await queue.enqueue("fail", "same", {})
+            await _wait_done(queue, first.id)
+            failed = await queue.get(first.id)
+            assert failed.state == FAILED and failed.error == "nope"
+            assert calls == [first.id]
+            # Enqueueing a failed key again resets and reruns the same job
+            again = await queue.enqueue("fail", "same", {})
+            assert again.id == first.id and again.state == PENDING and again.attempts == 0
+            await _wait_done(queue, first.id)
+            assert calls == [first.id, first.id]
+        finally:
+            await queue.stop()
+    run(main())
+
+
+def test_deferred_jobs_keep_their_attempts(tmp_path):
+    async def main():
+        queue = JobQueue(str(tmp_path / "jobs.db"), retry_delay=0.05, max_attempts=1)
+        calls = []
+
+        async def handler(job):
+            calls.append(job.attempts)
+            if len(calls) < 3:
+                raise DeferredError("breaker open")
+            return {}
+
+        queue.register("defer", handler)
+        await queue.start()
+        try:
+            job = await queue.enqueue("defer", "defer", {})
+            await _wait_done(queue, job.id)
+            assert (await queue.get(job.id)).state == SUCCEEDED
+            assert calls == [1, 1, 1]
+        finally:
+            await queue.stop()
+    run(main())
+
+
+def test_slow_job_keeps_its_lease(tmp_path):
+    async def main():
+        queues = _queues(str(tmp_path / "jobs.db"), workers=1, lease=0.3)
+        calls = []
+
+        async def handler(job):
+            calls.append(job.attempts)
+            # Several leases long; the heartbeat stops the other process from recovering it
+            await asyncio.sleep(1)
+            return {}
+
+        for queue in queues:
+            queue.register("slow", handler)
+            await queue.start()
+        try:
+            job = await queues[0].enqueue("slow", "slow", {})
+            await _wait_done(queues[1], job.id)
+            assert calls == [1]
+            assert (await queues[1].get(job.id)).state == SUCCEEDED
+        finally:
+            for queue in queues:
+                await queue.stop()
+    run(main())
+
+
+def test_orphaned_job_is_recovered(tmp_path):
+    async def main():
+        path = str(tmp_path / "jobs.db")
+        crashed = JobQueue(path)
+        await crashed.start()
+        job = await crashed.enqueue("work", "orphan", {})
+        await crashed.stop()
+        # Left running by a process that died well over a lease ago
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE jobs SET state = ?, attempts = 1, updated_at = ? WHERE id = ?", (RUNNING, time.time() - 60, job.id))
+        conn.commit()
+        conn.close()
+
+        queue = JobQueue(path, lease=5, retry_delay=0.05)
+        calls = []
+
+        async def handler(job):
+            calls.append(job.attempts)
+            return {}
+
+        queue.register("work", handler)
+        await queue.start()
+        try:
+            await _wait_done(queue, job.id)
+            assert calls == [2]
+            assert (await queue.get(job.id)).state == SUCCEEDED
+        finally:
+            await queue.stop()
+    run(main())
+
+
+def test_stale_run_does_not_overwrite_outcome(tmp_path):
+    async def main():
+        queue = JobQueue(str(tmp_path / "jobs.db"), retry_delay=60)
+        await queue.start()
+        # Stop the workers and drive the queue by hand
+        for task in queue._tasks:
+            task.cancel()
+        await asyncio.gather(*queue._tasks, return_exceptions=True)
+        try:
+            await queue.enqueue("work", "stale", {})
+            first = await queue._claim()
+            # Another process recovered and re-claimed it after our lease ran out
+            await queue._db("UPDATE jobs SET state = ? WHERE id = ?", (PENDING, first.id))
+            second = await queue._claim()
+            assert second.attempts == first.attempts + 1
+
+            await queue._finish(first, "UPDATE jobs SET state = ?, error = ?", (FAILED, "stale"))
+            assert (await queue.get(first.id)).state == RUNNING
+
+            await queue._finish(second, "UPDATE jobs SET state = ?, result = ?", (SUCCEEDED, "{}"))
+            assert (await queue.get(first.id)).state == SUCCEEDED
+        finally:
+            await queue.stop()
+    run(main())
+
+
+def test_worker_survives_database_errors(tmp_path):
+    async def main():
+        queue = JobQueue(str(tmp_path / "jobs.db"), workers=1, retry_delay=0.05)
+        calls = []
+
+        async def handler(job):
+            calls.append(job.id)
+            return {}
+
+        claim = queue._claim
+        failures = [sqlite3.OperationalError("database is locked")]
+
+        async def flaky_claim():
+            if failures:
+                raise failures.pop()
+            return await claim()
+
+        queue._claim = flaky_claim
+        queue.register("work", handler)
+        await queue.start()
+        try:
+            job = await queue.enqueue("work", "locked", {})
+            await _wait_done(queue, job.id)
+            assert calls == [job.id]
+            assert not failures
+        finally:
+            await queue.stop()
+    run(main())
+
+
+def test_completion_runs_once_after_the_job(tmp_path):
+    async def main():
+        queues = _queues(str(tmp_path / "jobs.db"), workers=2)
+        done = []
+
+        async def handler(job):
+            if job.payload["fail"]:
+                raise PermanentError("nope")
+            return {"ok": True}
+
+        async def completed(job):
+            done.append((job.key, job.state, job.result))
+
+        for queue in queues:
+            queue.register("work", handler)
+            queue.on_complete("work", completed)
+            await queue.start()
+        try:
+            ok = await queues[0].enqueue("work", "ok", {"fail": False})
+            failed = await queues[1].enqueue("work", "failed", {"fail": True})
+            for _ in range(100):
+                if len(done) == 2:
+                    break
+                await asyncio.sleep(0.02)
+            await asyncio.sleep(0.1)
+            assert sorted(done) == [("failed", FAILED, None), ("ok", SUCCEEDED, {"ok": True})]
+            assert (await queues[0].get(ok.id)).state == SUCCEEDED
+            assert (await queues[0].get(failed.id)).state == FAILED
+        finally:
+            for queue in queues:
+                await queue.stop()
+    run(main())
+
+
+def test_completion_is_delivered_after_a_restart(tmp_path):
+    async def main():
+        path = str(tmp_path / "jobs.db")
+        # This process finishes the job but has no completion registered (e.g. it died right after)
+        first = JobQueue(path, retry_delay=0.05)
+
+        async def handler(job):
+            return {}
+
+        first.register("work", handler)
+        await first.start()
+        job = await first.enqueue("work", "later", {})
+        await _wait_done(first, job.id)
+        await first.stop()
+
+        done = []
+        attempts = []
+
+        async def completed(job):
+            attempts.append(job.id)
+            if len(attempts) == 1:
+                raise RuntimeError("Discord unavailable")
+            done.append(job.id)
+
+        second = JobQueue(path, retry_delay=0.05, lease=0.2)
+        second.register("work", handler)
+        second.on_complete("work", completed)
+        await second.start()
+        try:
+            for _ in range(100):
+                if done:
+                    break
+                await asyncio.sleep(0.02)
+            # The failed delivery is retried once its claim expires, then not again
+            await asyncio.sleep(0.3)
+            assert done == [job.id] and attempts == [job.id, job.id]
+        finally:
+            await second.stop()
+    run(main())
+
+
+def test_checkpoint_survives_retries(tmp_path):
+    async def main():
+        queue = JobQueue(str(tmp_path / "jobs.db"), retry_delay=0.05)
+        seen = []
+
+        async def handler(job):
+            seen.append(dict(job.result or {}))
+            if job.attempts == 1:
+                await queue.checkpoint(job, marker=True)
+                raise RetryableError("reply lost")
+            return {"done": True}
+
+        queue.register("work", handler)
+        await queue.start()
+        try:
+            job = await queue.enqueue("work", "checkpoint", {})
+            await _wait_done(queue, job.id)
+            assert seen == [{}, {"marker": True}]
+            assert (await queue.get(job.id)).result == {"marker": True, "done": True}
+        finally:
+            await queue.stop()
+    run(main())
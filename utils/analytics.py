@@ -0,0 +1,330 @@
+import io
+import os
+import csv
+import json
+import time
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # optional: aggregations fall back to plain Python
+    np = None
+
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics")
+# Most points per node kept in the trend CSV; longer windows are sampled evenly
+REPORT_TREND_POINTS = int(os.getenv("REPORT_TREND_POINTS", "168"))
+
+logger = logging.getLogger("ptero-bot.analytics")
+
+# Row columns are 32-bit ints ('i'), timestamps and row offsets 64-bit ('q'), in native byte order
+assert array("i").itemsize == 4 and array("q").itemsize == 8
+
+SERVER_COLUMNS = ("panel", "server", "node", "owner", "memory", "cpu", "disk")
+NODE_COLUMNS = ("panel", "node", "memory", "disk")
+USAGE = ("memory", "cpu", "disk")
+# Per-snapshot counts of servers that appeared or disappeared since the previous snapshot
+CHANGE_COLUMNS = ("created", "deleted")
+
+
+def _read(path: str, typecode: str, start: int = 0, count: Optional[int] = None) -> array:
+    values = array(typecode)
+    if not os.path.exists(path):
+        return values
+    with open(path, "rb") as fh:
+        if count is None:
+            count = os.fstat(fh.fileno()).st_size // values.itemsize - start
+        fh.seek(start * values.itemsize)
+        try:
+            values.fromfile(fh, max(0, count))
+        except EOFError:
+            # fromfile keeps what it could read
+            pass
+    return values
+
+
+def _truncate(path: str, size: int) -> None:
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        with open(path, "r+b") as fh:
+            fh.truncate(size)
+
+
+class Table:
+    """Append-only columnar table: one binary file per column plus the cumulative
+    row count after each snapshot (``<name>.offsets.bin``)."""
+
+    def __init__(self, directory: str, name: str, columns: Tuple[str, ...]):
+        self.path = os.path.join(directory, name)
+        self.columns = columns
+        self.ends = array("q")
+
+    def _column_file(self, column: str) -> str:
+        return f"{self.path}.{column}.bin"
+
+    def _offsets_file(self) -> str:
+        return f"{self.path}.offsets.bin"
+
+    def load(self, snapshots: int) -> None:
+        self.ends = _read(self._offsets_file(), "q", 0, snapshots)
+
+    def repair(self, snapshots: int) -> None:
+        """Drop rows written by an append that never committed (e.g. a crash mid-snapshot)."""
+        self.load(snapshots)
+        rows = self.ends[-1] if self.ends else 0
+        _truncate(self._offsets_file(), len(self.ends) * 8)
+        for column in self.columns:
+            _truncate(self._column_file(column), rows * 4)
+
+    def append(self, rows: Dict[str, array]) -> None:
+        count = len(rows[self.columns[0]])
+        for column in self.columns:
+            with open(self._column_file(column), "ab") as fh:
+                rows[column].tofile(fh)
+        end = array("q", [(self.ends[-1] if self.ends else 0) + count])
+        with open(self._offsets_file(), "ab") as fh:
+            end.tofile(fh)
+        self.ends.extend(end)
+
+    def read(self, first: int, last: int, columns: Iterable[str]) -> Dict[str, array]:
+        """Rows of snapshots ``first``..``last`` (inclusive), one seek and read per column."""
+        start = self.ends[first - 1] if first > 0 else 0
+        count = self.ends[last] - start
+        return {column: _read(self._column_file(column), "i", start, count) for column in columns}
+
+
+def _np(values: array):
+    return np.frombuffer(values, dtype=np.int32)
+
+
+def _total(values: array) -> int:
+    if np is not None:
+        return int(_np(values).sum(dtype=np.int64))
+    return sum(values)
+
+
+def _keys(high: array, low: array):
+    """Pack two id columns into one 64-bit key per row (``high << 32 | low``)."""
+    if np is not None:
+        return (_np(high).astype(np.int64) << 32) | _np(low).astype(np.int64)
+    return [(h << 32) | l for h, l in zip(high, low)]
+
+
+def _split(key: int) -> Tuple[int, int]:
+    return key >> 32, key & 0xFFFFFFFF
+
+
+def _group_sum(keys, *values: array) -> Dict[int, List[int]]:
+    """``{key: [rows, sum of each value column]}``."""
+    if np is not None:
+        if not len(keys):
+            return {}
+        unique, inverse = np.unique(keys, return_inverse=True)
+        sums = [np.bincount(inverse, minlength=len(unique))]
+        sums.extend(np.bincount(inverse, weights=_np(v), minlength=len(unique)) for v in values)
+        return {int(k): [int(s[i]) for s in sums] for i, k in enumerate(unique)}
+    totals: Dict[int, List[int]] = {}
+    for i, key in enumerate(keys):
+        entry = totals.get(key)
+        if entry is None:
+            entry = totals[key] = [0] * (len(values) + 1)
+        entry[0] += 1
+        for j, v in enumerate(values, 1):
+            entry[j] += v[i]
+    return totals
+
+
+def _distinct(keys) -> set:
+    if np is not None:
+        return set(np.unique(keys).tolist())
+    return set(keys)
+
+
+class UsageReport:
+    """Aggregates over the snapshots taken since ``since``."""
+
+    def __init__(self, panels: List[str], since: float, start_at: float, end_at: float, snapshots: int):
+        self.panels = panels
+        self.since = since
+        self.start_at = start_at
+        self.end_at = end_at
+        self.snapshots = snapshots
+        # (servers, memory, cpu, disk) at the first and last snapshot of the window
+        self.totals_start: List[int] = [0, 0, 0, 0]
+        self.totals_end: List[int] = [0, 0, 0, 0]
+        self.created = 0
+        self.deleted = 0
+        # (panel, owner panel user id, servers, memory, cpu, disk), largest memory first
+        self.owners: List[Tuple[str, int, int, int, int, int]] = []
+        # (panel, node id): {"start": [...], "end": [...], "capacity": (memory, disk)}
+        self.nodes: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        # (timestamp, panel, node, servers, memory, cpu, disk)
+        self.trend: List[Tuple[float, str, int, int, int, int, int]] = []
+
+    def owners_csv(self) -> str:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["panel", "owner_id", "servers", "memory_mb", "cpu_percent", "disk_mb"])
+        writer.writerows(self.owners)
+        return out.getvalue()
+
+    def nodes_csv(self) -> str:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["timestamp", "panel", "node_id", "servers", "memory_mb", "cpu_percent", "disk_mb"])
+        for ts, *row in self.trend:
+            writer.writerow([time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)), *row])
+        return out.getvalue()
+
+
+class SnapshotStore:
+    """Hourly-ish snapshots of server limits and node capacity, stored column-wise.
+
+    ``snapshots.ts.bin`` holds one timestamp per snapshot and is written last,
+    so readers only ever see complete snapshots; panel names are stored once in
+    ``panels.json`` and rows refer to them by index.  ``snapshots.created.bin``
+    and ``snapshots.deleted.bin`` count the servers that appeared or disappeared
+    since the previous snapshot, so reports never scan the whole window.
+    Unlimited (0) limits count as 0 in every sum.
+    """
+
+    def __init__(self, directory: str = ANALYTICS_DIR):
+        self.directory = directory
+        self.servers = Table(directory, "servers", SERVER_COLUMNS)
+        self.nodes = Table(directory, "nodes", NODE_COLUMNS)
+        self.timestamps = array("q")
+        self.changes = {c: array("q") for c in CHANGE_COLUMNS}
+        self.panels: List[str] = []
+
+    def _timestamps_file(self) -> str:
+        return os.path.join(self.directory, "snapshots.ts.bin")
+
+    def _changes_file(self, column: str) -> str:
+        return os.path.join(self.directory, f"snapshots.{column}.bin")
+
+    def _panels_file(self) -> str:
+        return os.path.join(self.directory, "panels.json")
+
+    def load(self) -> None:
+        """Re-read the snapshot index; cheap enough to call before every report."""
+        if os.path.exists(self._panels_file()):
+            with open(self._panels_file(), "r", encoding="utf-8") as fh:
+                self.panels = json.load(fh)
+        self.timestamps = _read(self._timestamps_file(), "q")
+        self.servers.load(len(self.timestamps))
+        self.nodes.load(len(self.timestamps))
+        self.changes = {c: _read(self._changes_file(c), "q", 0, len(self.timestamps)) for c in CHANGE_COLUMNS}
+        # Offsets and counts may lag behind a timestamp only if the files were edited by hand
+        count = min(len(self.timestamps), len(self.servers.ends), len(self.nodes.ends), *(len(v) for v in self.changes.values()))
+        del self.timestamps[count:]
+
+    @property
+    def last_at(self) -> float:
+        return float(self.timestamps[-1]) if self.timestamps else 0.0
+
+    def _panel_index(self, name: str) -> int:
+        if name not in self.panels:
+            self.panels.append(name)
+            tmp = self._panels_file() + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self.panels, fh)
+            os.replace(tmp, self._panels_file())
+        return self.panels.index(name)
+
+    def append(self, timestamp: float, servers: Dict[str, List[Dict[str, Any]]], nodes: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Add one snapshot from per-panel server and node attributes."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.load()
+        count = len(self.timestamps)
+        self.servers.repair(count)
+        self.nodes.repair(count)
+        for column in CHANGE_COLUMNS:
+            _truncate(self._changes_file(column), count * 8)
+        _truncate(self._timestamps_file(), count * 8)
+
+        server_rows = {c: array("i") for c in SERVER_COLUMNS}
+        for panel, items in servers.items():
+            index = self._panel_index(panel)
+            for attr in items:
+                limits = attr.get("limits") or {}
+                for column, value in zip(SERVER_COLUMNS, (
+                    index, attr.get("id"), attr.get("node"), attr.get("user"),
+                    limits.get("memory"), limits.get("cpu"), limits.get("disk"),
+                )):
+                    server_rows[column].append(int(value or 0))
+        node_rows = {c: array("i") for c in NODE_COLUMNS}
+        for panel, items in nodes.items():
+            index = self._panel_index(panel)
+            for attr in items:
+                for column, value in zip(NODE_COLUMNS, (index, attr.get("id"), attr.get("memory"), attr.get("disk"))):
+                    node_rows[column].append(int(value or 0))
+
+        current = _distinct(_keys(server_rows["panel"], server_rows["server"]))
+        previous = self._server_keys(count - 1) if count else set()
+        changes = {"created": len(current - previous), "deleted": len(previous - current)}
+
+        self.servers.append(server_rows)
+        self.nodes.append(node_rows)
+        for column in CHANGE_COLUMNS:
+            value = array("q", [changes[column]])
+            with open(self._changes_file(column), "ab") as fh:
+                value.tofile(fh)
+            self.changes[column].extend(value)
+        stamp = array("q", [int(timestamp)])
+        with open(self._timestamps_file(), "ab") as fh:
+            stamp.tofile(fh)
+        self.timestamps.extend(stamp)
+
+    def _server_keys(self, index: int) -> set:
+        rows = self.servers.read(index, index, ("panel", "server"))
+        return _distinct(_keys(rows["panel"], rows["server"]))
+
+    def _usage(self, index: int) -> Tuple[List[int], Dict[int, List[int]]]:
+        rows = self.servers.read(index, index, SERVER_COLUMNS)
+        totals = [len(rows["server"])] + [_total(rows[c]) for c in USAGE]
+        by_node = _group_sum(_keys(rows["panel"], rows["node"]), *(rows[c] for c in USAGE))
+        return totals, by_node
+
+    def report(self, since: float, top: int = 10) -> Optional[UsageReport]:
+        """Aggregate the snapshots taken at or after ``since``; None when there are none."""
+        self.load()
+        first = bisect_left(self.timestamps, int(since))
+        last = len(self.timestamps) - 1
+        if first > last:
+            return None
+        report = UsageReport(list(self.panels), since, self.timestamps[first], self.timestamps[last], last - first + 1)
+
+        # Created/deleted: changes between consecutive snapshots after the window's first
+        report.created = sum(self.changes["created"][first + 1:last + 1])
+        report.deleted = sum(self.changes["deleted"][first + 1:last + 1])
+
+        report.totals_start, start_nodes = self._usage(first)
+        report.totals_end, end_nodes = self._usage(last)
+
+        rows = self.servers.read(last, last, ("panel", "owner") + USAGE)
+        owners = _group_sum(_keys(rows["panel"], rows["owner"]), *(rows[c] for c in USAGE))
+        ranked = sorted(owners.items(), key=lambda kv: kv[1][1], reverse=True)[:max(0, top)]
+        report.owners = [(self.panels[p], owner, *sums) for (p, owner), sums in ((_split(k), v) for k, v in ranked)]
+
+        capacity = self.nodes.read(last, last, NODE_COLUMNS)
+        capacities = {(p << 32) | n: (m, d) for p, n, m, d in zip(capacity["panel"], capacity["node"], capacity["memory"], capacity["disk"])}
+        for key in set(start_nodes) | set(end_nodes) | set(capacities):
+            panel, node = _split(key)
+            report.nodes[(self.panels[panel], node)] = {
+                "start": start_nodes.get(key, [0, 0, 0, 0]),
+                "end": end_nodes.get(key, [0, 0, 0, 0]),
+                "capacity": capacities.get(key, (0, 0)),
+            }
+
+        points = min(report.snapshots, max(2, REPORT_TREND_POINTS))
+        step = (report.snapshots - 1) / (points - 1) if points > 1 else 0
+        for index in sorted({first + round(i * step) for i in range(points)}):
+            _, by_node = self._usage(index)
+            for key, (servers, memory, cpu, disk) in sorted(by_node.items()):
+                panel, node = _split(key)
+                report.trend.append((self.timestamps[index], self.panels[panel], node, servers, memory, cpu, disk))
+        return report
+
+
+store = SnapshotStore()
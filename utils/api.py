@@ -1,277 +1,442 @@
 import os
+import time
 import aiohttp
+import asyncio
 import secrets
 import string
-from typing import Optional, Dict, Any, Tuple, List
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, List, AsyncIterator, Callable, Awaitable
+
+from utils.breaker import CircuitBreaker
+from utils.cache import TTLCache
+from utils.coordination import coordinator
+from utils.ratelimit import RateLimiter
 
-PANEL_URL = os.getenv("PTERODACTYL_PANEL_URL", "").rstrip("/")
-API_KEY = os.getenv("PTERODACTYL_API_KEY", "")
 DEFAULT_USER_PASSWORD_LENGTH = int(os.getenv("DEFAULT_USER_PASSWORD_LENGTH", 16))
+EGG_CACHE_TTL = int(os.getenv("EGG_CACHE_TTL", "3600"))
+PANEL_REQUEST_TIMEOUT = float(os.getenv("PANEL_REQUEST_TIMEOUT", "15"))
+# Per-panel budget for Application API requests (requests/second, burst)
+PANEL_RATE = float(os.getenv("PANEL_RATE", "10"))
+PANEL_BURST = int(os.getenv("PANEL_BURST", "20"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_LATENCY_THRESHOLD = float(os.getenv("BREAKER_LATENCY_THRESHOLD", "5"))
+BREAKER_PROBE_INTERVAL = float(os.getenv("BREAKER_PROBE_INTERVAL", "15"))
+STALE_CACHE_SIZE = int(os.getenv("STALE_CACHE_SIZE", "512"))
+# Seconds an allocation stays reserved for a server being created
+ALLOCATION_RESERVATION_TTL = float(os.getenv("ALLOCATION_RESERVATION_TTL", "300"))
 
-if not PANEL_URL or not API_KEY:
-    raise RuntimeError("PTERODACTYL_PANEL_URL and PTERODACTYL_API_KEY must be set in environment")
+def random_password(length: int = DEFAULT_USER_PASSWORD_LENGTH) -> str:
+    alphabet = string.ascii_letters + string.digits + "-_"
+    return ''.join(secrets.choice(alphabet) for _ in range(length))
 
-HEADERS = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Accept": "Application/vnd.pterodactyl.v1+json",
-    "Content-Type": "application/json"
-}
 
-_session: Optional[aiohttp.ClientSession] = None
+class PanelClient:
+    """Application API client for one panel: its own session, caches, limiter and breaker."""
 
-def _get_session() -> aiohttp.ClientSession:
-    global _session
-    if _session is None or _session.closed:
-        _session = aiohttp.ClientSession()
-    return _session
+    def __init__(self, name: str, url: str, api_key: str, client_api_key: str = ""):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.client_api_key = client_api_key
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "Application/vnd.pterodactyl.v1+json",
+            "Content-Type": "application/json"
+        }
+        self.limiter = RateLimiter(PANEL_RATE, PANEL_BURST)
+        self.breaker = CircuitBreaker(
+            self.ping_panel,
+            failure_threshold=BREAKER_FAILURE_THRESHOLD,
+            latency_threshold=BREAKER_LATENCY_THRESHOLD,
+            probe_interval=BREAKER_PROBE_INTERVAL,
+            name=name,
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._egg_cache = TTLCache(ttl=EGG_CACHE_TTL)
+        # Last successful GET response per URL, served (marked stale) while the breaker is open
+        self._last_known: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
 
-async def close_session():
-    global _session
-    if _session:
-        await _session.close()
-        _session = None
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers=self.headers)
+        return self._session
 
-def random_password(length: int = DEFAULT_USER_PASSWORD_LENGTH) -> str:
-    alphabet = string.ascii_letters + string.digits + "-_"
-    return ''.join(secrets.choice(alphabet) for _ in range(length))
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
 
-# -----------------
-# Node / Egg
-# -----------------
-async def get_node(node_id: int) -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/nodes/{node_id}"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        data = await resp.json()
-        return {"status": resp.status, "data": data}
-
-async def list_nodes() -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/nodes"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        data = await resp.json()
-        return {"status": resp.status, "data": data}
-
-async def get_egg(egg_id: int) -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/eggs/{egg_id}"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        data = await resp.json()
-        return {"status": resp.status, "data": data}
-
-async def list_eggs() -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/nests"
-    # Many panels list eggs nested under nests; for simplicity, fetch nests then eggs per nest
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        nests = await resp.json()
-        return {"status": resp.status, "data": nests}
+    async def _request(self, method: str, path: str, json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send one Application API request through the circuit breaker.
 
-# -----------------
-# Users
-# -----------------
-async def find_user_by_email(email: str) -> Optional[Dict[str, Any]]:
-    # Try filter endpoint
-    url = f"{PANEL_URL}/api/application/users?filter[email]={email}"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        if resp.status != 200:
+        Returns ``{"status", "data"}``; 204 and unparsable bodies give empty data.
+        While the breaker is open, GETs are answered from the last known response
+        with ``"stale": True`` and writes fail immediately with status 503.
+        """
+        url = f"{self.url}{path}"
+        if not self.breaker.allow():
+            return self._unavailable(method, url)
+        await self.limiter.acquire()
+        started = time.monotonic()
+        try:
+            async with self._get_session().request(method, url, json=json, timeout=aiohttp.ClientTimeout(total=PANEL_REQUEST_TIMEOUT)) as resp:
+                try:
+                    data = await resp.json() if resp.status != 204 else {}
+                except Exception:
+                    data = {}
+                result = {"status": resp.status, "data": data}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.breaker.record_failure()
+            if not self.breaker.allow():
+                return self._unavailable(method, url)
+            return {"status": 504 if isinstance(e, asyncio.TimeoutError) else 502, "data": {"error": f"Panel request failed: {e.__class__.__name__}"}}
+
+        if result["status"] >= 500:
+            self.breaker.record_failure()
+            if not self.breaker.allow():
+                return self._unavailable(method, url)
+        else:
+            self.breaker.record_success(time.monotonic() - started)
+        if method == "GET" and result["status"] == 200:
+            self._last_known[url] = result
+            self._last_known.move_to_end(url)
+            while len(self._last_known) > STALE_CACHE_SIZE:
+                self._last_known.popitem(last=False)
+        return result
+
+    def _unavailable(self, method: str, url: str) -> Dict[str, Any]:
+        if method == "GET" and url in self._last_known:
+            return dict(self._last_known[url], stale=True)
+        return {"status": 503, "data": {"error": f"Panel {self.name} unavailable, try again later"}, "stale": method == "GET"}
+
+    # -----------------
+    # Pagination
+    # -----------------
+    async def iter_pages(self, path: str, per_page: int = 100, start_page: int = 1, limiter: Optional[RateLimiter] = None) -> AsyncIterator[Tuple[int, int, List[Dict[str, Any]]]]:
+        """Stream a paginated Application API list as ``(page, total_pages, items)``.
+
+        Pass a ``limiter`` to pace background scans so they leave headroom for
+        interactive commands.
+        """
+        page = start_page
+        while True:
+            if limiter is not None:
+                await limiter.acquire()
+            sep = "&" if "?" in path else "?"
+            resp = await self._request("GET", f"{path}{sep}page={page}&per_page={per_page}")
+            if resp["status"] != 200 or resp.get("stale"):
+                raise RuntimeError(f"GET {path} page {page} failed with status {resp['status']}")
+            data = resp["data"]
+            items = [item.get("attributes", item) for item in data.get("data", [])]
+            total_pages = data.get("meta", {}).get("pagination", {}).get("total_pages", page)
+            yield page, total_pages, items
+            if page >= total_pages:
+                return
+            page += 1
+
+    async def iter_users(self, **kwargs) -> AsyncIterator[Tuple[int, int, List[Dict[str, Any]]]]:
+        async for chunk in self.iter_pages("/api/application/users", **kwargs):
+            yield chunk
+
+    async def iter_servers(self, **kwargs) -> AsyncIterator[Tuple[int, int, List[Dict[str, Any]]]]:
+        async for chunk in self.iter_pages("/api/application/servers", **kwargs):
+            yield chunk
+
+    async def iter_nodes(self, **kwargs) -> AsyncIterator[Tuple[int, int, List[Dict[str, Any]]]]:
+        async for chunk in self.iter_pages("/api/application/nodes", **kwargs):
+            yield chunk
+
+    # -----------------
+    # Node / Egg
+    # -----------------
+    async def get_node(self, node_id: int) -> Dict[str, Any]:
+        return await self._request("GET", f"/api/application/nodes/{node_id}")
+
+    async def list_nodes(self) -> Dict[str, Any]:
+        return await self._request("GET", "/api/application/nodes")
+
+    async def get_egg(self, egg_id: int) -> Dict[str, Any]:
+        return await self._request("GET", f"/api/application/eggs/{egg_id}")
+
+    async def get_egg_definition(self, nest_id: int, egg_id: int, refresh: bool = False) -> Dict[str, Any]:
+        """Fetch an egg with its variables, cached for EGG_CACHE_TTL seconds (shared between processes)."""
+        key = (nest_id, egg_id)
+        shared_key = f"egg:{self.name}:{nest_id}:{egg_id}"
+        if not refresh:
+            cached = self._egg_cache.get(key)
+            if cached is None:
+                cached = await coordinator.get_json(shared_key)
+                if cached is not None:
+                    self._egg_cache.set(key, cached)
+            if cached is not None:
+                return cached
+        result = await self._request("GET", f"/api/application/nests/{nest_id}/eggs/{egg_id}?include=variables")
+        if result["status"] == 200 and not result.get("stale"):
+            self._egg_cache.set(key, result)
+            await coordinator.set_json(shared_key, result, ttl=EGG_CACHE_TTL)
+        return result
+
+    async def list_eggs(self) -> Dict[str, Any]:
+        # Many panels list eggs nested under nests; for simplicity, fetch nests then eggs per nest
+        return await self._request("GET", "/api/application/nests")
+
+    # -----------------
+    # Users
+    # -----------------
+    async def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        # Try filter endpoint
+        resp = await self._request("GET", f"/api/application/users?filter[email]={email}")
+        if resp["status"] != 200:
             return None
-        data = await resp.json()
+        data = resp["data"]
         if isinstance(data, dict) and data.get("data"):
             # return first user's attributes
             return data["data"][0].get("attributes", data["data"][0])
-    return None
-
-async def list_users() -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/users"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        data = await resp.json()
-        return {"status": resp.status, "data": data}
-
-async def search_users(query: str) -> Dict[str, Any]:
-    # No standardized search; filter by username or email if supported
-    # Try email filter first
-    url = f"{PANEL_URL}/api/application/users?filter[email]={query}"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        data = await resp.json()
-        return {"status": resp.status, "data": data}
-
-async def create_user(email: str, username: str, first_name: str = "Panel", last_name: str = "User", password: Optional[str] = None) -> Dict[str, Any]:
-    if password is None:
-        password = random_password()
-    payload = {
-        "email": email,
-        "username": username,
-        "first_name": first_name,
-        "last_name": last_name,
-        "password": password
-    }
-    url = f"{PANEL_URL}/api/application/users"
-    async with _get_session().post(url, json=payload, headers=HEADERS) as resp:
-        try:
-            data = await resp.json()
-        except Exception:
-            data = {}
-        return {"status": resp.status, "data": data, "password": password if resp.status in (200,201) else None}
-
-async def delete_user(user_id: int) -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/users/{user_id}"
-    async with _get_session().delete(url, headers=HEADERS) as resp:
-        if resp.status in (204, 200):
-            return {"status": resp.status, "data": {}}
-        data = await resp.json()
-        return {"status": resp.status, "data": data}
-
-async def change_user_password(user_id: int, new_password: Optional[str] = None) -> Dict[str, Any]:
-    if new_password is None:
-        new_password = random_password()
-    payload = {"password": new_password}
-    url = f"{PANEL_URL}/api/application/users/{user_id}/reset-password"
-    # Some panel versions use different endpoints; try a generic PUT to user endpoint if reset fails.
-    async with _get_session().post(url, json=payload, headers=HEADERS) as resp:
-        # If panel doesn't support, return fallback
-        if resp.status in (200, 204):
-            return {"status": resp.status, "data": {}, "password": new_password}
-        try:
-            data = await resp.json()
-        except Exception:
-            data = {}
-        return {"status": resp.status, "data": data}
+        return None
 
-# -----------------
-# Servers
-# -----------------
-async def get_node_allocations(node_id: int) -> Tuple[int, Optional[Dict[str, Any]]]:
-    url = f"{PANEL_URL}/api/application/nodes/{node_id}/allocations"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        data = await resp.json()
-        return resp.status, data
-
-async def create_server(
-    name: str,
-    user_id: int,
-    node_id: int,
-    egg_id: int,
-    ram: int,
-    cpu: int,
-    disk: int,
-    version: str,
-    startup: Optional[str] = None
-) -> Dict[str, Any]:
-    # Get allocations for node
-    alloc_status, alloc_data = await get_node_allocations(node_id)
-    if alloc_status != 200:
-        return {"status": alloc_status, "error": "Failed to fetch node allocations", "data": alloc_data}
-    allocations = alloc_data.get("data", []) if isinstance(alloc_data, dict) else []
-    if not allocations:
-        return {"status": 400, "error": "No allocations available on node", "data": alloc_data}
-    alloc_id = allocations[0]["attributes"]["id"]
-
-    payload = {
-        "name": name,
-        "user": user_id,
-        "egg": egg_id,
-        "startup": startup or "",
-        "docker_image": None,
-        "environment": {},
-        "limits": {
-            "memory": ram,
-            "swap": 0,
-            "disk": disk,
-            "io": 500,
-            "cpu": cpu
-        },
-        "feature_limits": {
-            "databases": 0,
-            "backups": 0
-        },
-        "allocation": {
-            "default": alloc_id
+    async def list_users(self) -> Dict[str, Any]:
+        return await self._request("GET", "/api/application/users")
+
+    async def search_users(self, query: str) -> Dict[str, Any]:
+        # No standardized search; filter by username or email if supported
+        # Try email filter first
+        return await self._request("GET", f"/api/application/users?filter[email]={query}")
+
+    async def create_user(self, email: str, username: str, first_name: str = "Panel", last_name: str = "User", password: Optional[str] = None) -> Dict[str, Any]:
+        if password is None:
+            password = random_password()
+        payload = {
+            "email": email,
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "password": password
         }
-    }
-    url = f"{PANEL_URL}/api/application/servers"
-    async with _get_session().post(url, json=payload, headers=HEADERS) as resp:
-        try:
-            data = await resp.json()
-        except Exception:
-            data = {}
-        return {"status": resp.status, "data": data}
-
-async def delete_server(server_id: str) -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/servers/{server_id}"
-    async with _get_session().delete(url, headers=HEADERS) as resp:
-        if resp.status in (204, 200):
-            return {"status": resp.status, "data": {}}
-        data = await resp.json()
-        return {"status": resp.status, "data": data}
-
-async def suspend_server(server_id: str) -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/servers/{server_id}/suspend"
-    async with _get_session().post(url, headers=HEADERS) as resp:
-        try:
-            data = await resp.json()
-        except Exception:
-            data = {}
-        return {"status": resp.status, "data": data}
+        resp = await self._request("POST", "/api/application/users", json=payload)
+        resp["password"] = password if resp["status"] in (200, 201) else None
+        return resp
 
-async def unsuspend_server(server_id: str) -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/servers/{server_id}/unsuspend"
-    async with _get_session().post(url, headers=HEADERS) as resp:
-        try:
-            data = await resp.json()
-        except Exception:
-            data = {}
-        return {"status": resp.status, "data": data}
-
-async def set_server_resources(server_id: str, memory: Optional[int] = None, cpu: Optional[int] = None, disk: Optional[int] = None) -> Dict[str, Any]:
-    payload = {"limits": {}}
-    if memory is not None:
-        payload["limits"]["memory"] = memory
-    if cpu is not None:
-        payload["limits"]["cpu"] = cpu
-    if disk is not None:
-        payload["limits"]["disk"] = disk
-    url = f"{PANEL_URL}/api/application/servers/{server_id}/build"
-    async with _get_session().put(url, json=payload, headers=HEADERS) as resp:
-        try:
-            data = await resp.json()
-        except Exception:
-            data = {}
-        return {"status": resp.status, "data": data}
+    async def delete_user(self, user_id: int) -> Dict[str, Any]:
+        return await self._request("DELETE", f"/api/application/users/{user_id}")
 
-async def get_server(server_id: str) -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/servers/{server_id}"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        try:
-            data = await resp.json()
-        except Exception:
-            data = {}
-        return {"status": resp.status, "data": data}
+    async def get_user(self, user_id: int) -> Dict[str, Any]:
+        return await self._request("GET", f"/api/application/users/{user_id}")
 
-async def list_servers() -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/servers"
-    async with _get_session().get(url, headers=HEADERS) as resp:
-        try:
-            data = await resp.json()
-        except Exception:
-            data = {}
-        return {"status": resp.status, "data": data}
+    async def change_user_password(self, user_id: int, new_password: Optional[str] = None) -> Dict[str, Any]:
+        """Set a user's password; returns ``{"status", "data", "password"}`` on success.
 
-# -----------------
-# Backups
-# -----------------
-async def list_backups(server_id: str) -> Dict[str, Any]:
-    url = f"{PANEL_URL}/api/application/servers/{server_id}/backups"
-    async with _get_session().get(url, headers=HEADERS) as resp:
+        The Application API has no password endpoint: the password is sent with
+        a full user update, so the user's current details are fetched first.
+        """
+        if new_password is None:
+            new_password = random_password()
+        current = await self.get_user(user_id)
+        if current.get("stale"):
+            return {"status": 503, "data": {"error": f"Panel {self.name} unavailable, try again later"}}
+        if current["status"] != 200:
+            return current
+        attrs = current["data"].get("attributes", {})
+        payload = {
+            "email": attrs.get("email"),
+            "username": attrs.get("username"),
+            "first_name": attrs.get("first_name"),
+            "last_name": attrs.get("last_name"),
+            "password": new_password,
+        }
+        resp = await self._request("PATCH", f"/api/application/users/{user_id}", json=payload)
+        if resp["status"] == 200:
+            return {"status": resp["status"], "data": resp["data"], "password": new_password}
+        return resp
+
+    # -----------------
+    # Servers
+    # -----------------
+    async def get_node_allocations(self, node_id: int, page: int = 1) -> Tuple[int, Optional[Dict[str, Any]]]:
+        resp = await self._request("GET", f"/api/application/nodes/{node_id}/allocations?page={page}&per_page=100")
+        return resp["status"], resp["data"]
+
+    async def create_server(
+        self,
+        name: str,
+        user_id: int,
+        node_id: int,
+        egg_id: int,
+        ram: int,
+        cpu: int,
+        disk: int,
+        version: str,
+        startup: Optional[str] = None,
+        external_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        payload = {
+            "name": name,
+            "user": user_id,
+            "egg": egg_id,
+            "startup": startup or "",
+            "docker_image": None,
+            "environment": {},
+            "limits": {
+                "memory": ram,
+                "swap": 0,
+                "disk": disk,
+                "io": 500,
+                "cpu": cpu
+            },
+            "feature_limits": {
+                "databases": 0,
+                "backups": 0
+            }
+        }
+        if external_id:
+            payload["external_id"] = external_id
+        return await self.create_server_from_payload(payload, node_id)
+
+    async def create_server_from_payload(self, payload: Dict[str, Any], node_id: int) -> Dict[str, Any]:
+        """Create a server from a prebuilt payload, filling in a free allocation on ``node_id``.
+
+        Allocations already assigned on the panel are skipped, and the chosen
+        one is reserved through the coordination backend so concurrent creates
+        (in this or another bot process) never pick the same allocation.
+        """
+        page = 1
+        while True:
+            alloc_status, alloc_data = await self.get_node_allocations(node_id, page)
+            if alloc_status != 200:
+                return {"status": alloc_status, "error": "Failed to fetch node allocations", "data": alloc_data}
+            alloc_data = alloc_data if isinstance(alloc_data, dict) else {}
+            for item in alloc_data.get("data", []):
+                attr = item.get("attributes", {})
+                if attr.get("assigned"):
+                    continue
+                reservation = f"allocation:{self.name}:{attr['id']}"
+                token = await coordinator.reserve(reservation, ALLOCATION_RESERVATION_TTL)
+                if token is None:
+                    continue
+                payload = dict(payload)
+                payload["allocation"] = {"default": attr["id"]}
+                resp = await self._request("POST", "/api/application/servers", json=payload)
+                # On success the panel marks the allocation assigned; the reservation just expires
+                if resp["status"] not in (200, 201):
+                    await coordinator.release(reservation, token)
+                return resp
+            if page >= alloc_data.get("meta", {}).get("pagination", {}).get("total_pages", page):
+                return {"status": 400, "error": "No free allocations on node", "data": alloc_data}
+            page += 1
+
+    async def delete_server(self, server_id: str) -> Dict[str, Any]:
+        return await self._request("DELETE", f"/api/application/servers/{server_id}")
+
+    async def suspend_server(self, server_id: str) -> Dict[str, Any]:
+        return await self._request("POST", f"/api/application/servers/{server_id}/suspend")
+
+    async def unsuspend_server(self, server_id: str) -> Dict[str, Any]:
+        return await self._request("POST", f"/api/application/servers/{server_id}/unsuspend")
+
+    async def set_server_resources(self, server_id: str, memory: Optional[int] = None, cpu: Optional[int] = None, disk: Optional[int] = None) -> Dict[str, Any]:
+        payload = {"limits": {}}
+        if memory is not None:
+            payload["limits"]["memory"] = memory
+        if cpu is not None:
+            payload["limits"]["cpu"] = cpu
+        if disk is not None:
+            payload["limits"]["disk"] = disk
+        return await self._request("PUT", f"/api/application/servers/{server_id}/build", json=payload)
+
+    async def get_server(self, server_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/api/application/servers/{server_id}")
+
+    async def get_server_by_external_id(self, external_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/api/application/servers/external/{external_id}")
+
+    async def list_servers(self) -> Dict[str, Any]:
+        return await self._request("GET", "/api/application/servers")
+
+    # -----------------
+    # Utility / Health
+    # -----------------
+    async def ping_panel(self) -> bool:
+        # Bypasses the breaker: this is the probe that closes it again
+        url = f"{self.url}/api/application"
         try:
-            data = await resp.json()
+            async with self._get_session().get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                return resp.status == 200
         except Exception:
-            data = {}
-        return {"status": resp.status, "data": data}
+            return False
+
 
 # -----------------
-# Utility / Health
+# Panel registry
 # -----------------
-async def ping_panel() -> bool:
-    url = f"{PANEL_URL}/api/application"
-    try:
-        async with _get_session().get(url, headers=HEADERS, timeout=10) as resp:
-            return resp.status == 200
-    except Exception:
-        return False
+def _load_panels() -> Dict[str, PanelClient]:
+    """Build the named panels from the environment.
+
+    ``PTERODACTYL_PANELS=eu,us`` configures each panel through
+    ``PTERODACTYL_<NAME>_PANEL_URL``, ``PTERODACTYL_<NAME>_API_KEY`` and
+    ``PTERODACTYL_<NAME>_CLIENT_API_KEY``.  Without it, a single panel named
+    ``default`` is read from the unprefixed variables.
+    """
+    names = [n.strip() for n in os.getenv("PTERODACTYL_PANELS", "").split(",") if n.strip()]
+    if not names:
+        url = os.getenv("PTERODACTYL_PANEL_URL", "")
+        key = os.getenv("PTERODACTYL_API_KEY", "")
+        if not url or not key:
+            raise RuntimeError("PTERODACTYL_PANEL_URL and PTERODACTYL_API_KEY must be set in environment")
+        return {"default": PanelClient("default", url, key, os.getenv("PTERODACTYL_CLIENT_API_KEY", ""))}
+
+    loaded = {}
+    for name in names:
+        prefix = f"PTERODACTYL_{name.upper()}_"
+        url = os.getenv(prefix + "PANEL_URL", "")
+        key = os.getenv(prefix + "API_KEY", "")
+        if not url or not key:
+            raise RuntimeError(f"{prefix}PANEL_URL and {prefix}API_KEY must be set in environment")
+        loaded[name] = PanelClient(name, url, key, os.getenv(prefix + "CLIENT_API_KEY", ""))
+    return loaded
+
+panels: Dict[str, PanelClient] = _load_panels()
+DEFAULT_PANEL = os.getenv("DEFAULT_PANEL") or next(iter(panels))
+if DEFAULT_PANEL not in panels:
+    raise RuntimeError(f"DEFAULT_PANEL {DEFAULT_PANEL} is not listed in PTERODACTYL_PANELS")
+
+def get_client(name: Optional[str] = None) -> PanelClient:
+    """Client for panel ``name``, or the default panel; raises KeyError for unknown names."""
+    return panels[name or DEFAULT_PANEL]
+
+def panel_names() -> List[str]:
+    return list(panels)
+
+def multi_panel() -> bool:
+    return len(panels) > 1
+
+async def fan_out(call: Callable[[PanelClient], Awaitable[Any]], names: Optional[List[str]] = None) -> List[Tuple[str, Any]]:
+    """Run ``call`` against several panels (all by default) concurrently.
+
+    Returns ``(panel_name, result)`` pairs in registry order; a panel whose
+    call raised gets a ``{"status": 0}`` response so one bad panel can't sink
+    the whole query.
+    """
+    clients = [panels[n] for n in (names or panels)]
+    results = await asyncio.gather(*(call(c) for c in clients), return_exceptions=True)
+    merged = []
+    for client, result in zip(clients, results):
+        if isinstance(result, Exception):
+            result = {"status": 0, "data": {"error": f"{result.__class__.__name__}: {result}"}}
+        merged.append((client.name, result))
+    return merged
+
+def merged_attributes(results: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Flatten fanned-out list responses into ``(panel_name, attributes)`` pairs, skipping failed panels."""
+    merged = []
+    for name, resp in results:
+        data = resp.get("data") or {}
+        if resp.get("status") != 200 or not isinstance(data, dict):
+            continue
+        for item in data.get("data") or []:
+            merged.append((name, item.get("attributes", item)))
+    return merged
+
+def panel_tag(name: str) -> str:
+    """``[name] `` prefix for list lines, empty when only one panel is configured."""
+    return f"[{name}] " if multi_panel() else ""
+
+async def close_sessions():
+    await asyncio.gather(*(c.close() for c in panels.values()))
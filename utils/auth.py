@@ -0,0 +1,125 @@
+import os
+import logging
+from typing import Optional, Dict, FrozenSet, Mapping, Iterable
+
+import discord
+from discord import app_commands
+from dotenv import dotenv_values
+
+logger = logging.getLogger("ptero-bot.auth")
+
+# Variables re-read from .env on reload
+AUTH_VARIABLES = ("ADMIN_IDS", "ADMIN_ROLE_IDS", "PERMISSION_SCOPES")
+
+
+def _ids(raw: str) -> FrozenSet[int]:
+    return frozenset(int(part) for part in raw.replace(" ", "").split(",") if part)
+
+
+def _scopes(raw: str) -> Dict[str, FrozenSet[int]]:
+    """Parse ``scope:id,id;scope:id`` into ``{scope: ids}``."""
+    scopes: Dict[str, FrozenSet[int]] = {}
+    for entry in raw.split(";"):
+        if not entry.strip():
+            continue
+        name, sep, ids = entry.partition(":")
+        if not sep or not name.strip():
+            raise ValueError(f"Invalid PERMISSION_SCOPES entry {entry.strip()!r}, expected scope:id,id")
+        scopes[name.strip()] = scopes.get(name.strip(), frozenset()) | _ids(ids)
+    return scopes
+
+
+class NotAuthorized(app_commands.CheckFailure):
+    """Raised by :func:`require` when the invoker may not run the command."""
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        super().__init__(f"Missing permission scope {scope}")
+
+
+class Permissions:
+    """Admin user/role IDs and scope grants, parsed once.
+
+    Admins (``ADMIN_IDS`` users and members with an ``ADMIN_ROLE_IDS`` role)
+    may run every command. ``PERMISSION_SCOPES`` grants single scopes to
+    further users or roles; Discord IDs never collide, so one list holds both.
+    """
+
+    __slots__ = ("admin_ids", "admin_role_ids", "scopes")
+
+    def __init__(self, admin_ids: FrozenSet[int], admin_role_ids: FrozenSet[int], scopes: Mapping[str, FrozenSet[int]]):
+        self.admin_ids = admin_ids
+        self.admin_role_ids = admin_role_ids
+        self.scopes = dict(scopes)
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, Optional[str]]) -> "Permissions":
+        return cls(
+            _ids(env.get("ADMIN_IDS") or ""),
+            _ids(env.get("ADMIN_ROLE_IDS") or ""),
+            _scopes(env.get("PERMISSION_SCOPES") or ""),
+        )
+
+    def is_admin(self, user_id: int, role_ids: Iterable[int] = ()) -> bool:
+        return user_id in self.admin_ids or not self.admin_role_ids.isdisjoint(role_ids)
+
+    def allowed(self, user_id: int, role_ids: Iterable[int], *scopes: str) -> bool:
+        """Whether the user is an admin or holds any of ``scopes``."""
+        role_ids = frozenset(role_ids)
+        if self.is_admin(user_id, role_ids):
+            return True
+        for scope in scopes:
+            granted = self.scopes.get(scope)
+            if granted and (user_id in granted or not granted.isdisjoint(role_ids)):
+                return True
+        return False
+
+    def describe(self) -> str:
+        scopes = ", ".join(f"{name} ({len(ids)})" for name, ids in sorted(self.scopes.items())) or "none"
+        return f"{len(self.admin_ids)} admin users, {len(self.admin_role_ids)} admin roles, scopes: {scopes}"
+
+
+permissions = Permissions.from_env(os.environ)
+
+# Auth variables whose startup value came from .env (load_dotenv never overrides
+# the real environment). Removing one of them from .env revokes it on reload
+# instead of falling back to the copy load_dotenv left in os.environ.
+_DOTENV_KEYS = frozenset(key for key, value in dotenv_values().items() if key in AUTH_VARIABLES and os.environ.get(key) == value)
+
+
+def reload() -> Permissions:
+    """Re-read the auth settings (``.env`` wins over the process environment) and swap them in.
+
+    A variable that came from ``.env`` at startup and was since deleted from
+    it is treated as empty; ones set only in the real environment are kept.
+    Read ``auth.permissions`` at call time rather than importing the name, so
+    callers see the swap. On a parse error the current permissions stay in place.
+    """
+    global permissions
+    env = {key: None if key in _DOTENV_KEYS else os.getenv(key) for key in AUTH_VARIABLES}
+    env.update({key: value for key, value in dotenv_values().items() if key in AUTH_VARIABLES})
+    updated = Permissions.from_env(env)
+    permissions = updated
+    logger.info("Permissions reloaded: %s", updated.describe())
+    return updated
+
+
+def role_ids(user: discord.abc.User) -> FrozenSet[int]:
+    # Users in DMs have no roles
+    return frozenset(role.id for role in getattr(user, "roles", ()))
+
+
+def require(scope: Optional[str] = None):
+    """``app_commands.check`` letting admins, and anyone granted ``scope`` or the command's own name, run a command.
+
+    Without ``scope`` the command is admin-only unless its name is granted.
+    """
+
+    def predicate(interaction: discord.Interaction) -> bool:
+        command = interaction.command.qualified_name if interaction.command else ""
+        scopes = (scope, command) if scope else (command,)
+        if permissions.allowed(interaction.user.id, role_ids(interaction.user), *scopes):
+            return True
+        raise NotAuthorized(scope or command)
+
+    return app_commands.check(predicate)
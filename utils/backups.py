@@ -0,0 +1,194 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from utils import api as ptero_api
+from utils import ownership
+from utils import client_api
+from utils.coordination import coordinator
+
+BACKUP_INVENTORY_TTL = int(os.getenv("BACKUP_INVENTORY_TTL", "1800"))
+BACKUP_FANOUT_CONCURRENCY = int(os.getenv("BACKUP_FANOUT_CONCURRENCY", "8"))
+
+logger = logging.getLogger("ptero-bot.backups")
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class ServerBackups:
+    """Backups of one server as seen at the last inventory build."""
+
+    __slots__ = ("server_id", "identifier", "name", "owner", "backups", "error")
+
+    def __init__(self, attr: Dict[str, Any]):
+        self.server_id = attr.get("id")
+        self.identifier = attr.get("identifier")
+        self.name = attr.get("name") or ""
+        self.owner = attr.get("user")
+        # (uuid, name, bytes, created_at timestamp, successful)
+        self.backups: List[Tuple[str, str, int, Optional[float], bool]] = []
+        self.error: Optional[int] = None
+
+    def load(self, resp: Dict[str, Any]) -> None:
+        if resp.get("status") != 200:
+            self.error = resp.get("status", 0)
+            return
+        self.error = None
+        self.backups = []
+        for item in (resp.get("data") or {}).get("data", []):
+            a = item.get("attributes", {})
+            self.backups.append((
+                a.get("uuid"),
+                a.get("name") or "",
+                int(a.get("bytes") or 0),
+                _timestamp(a.get("completed_at") or a.get("created_at")),
+                bool(a.get("is_successful", True)) and a.get("completed_at") is not None,
+            ))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "attr": {"id": self.server_id, "identifier": self.identifier, "name": self.name, "user": self.owner},
+            "backups": self.backups,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ServerBackups":
+        entry = cls(data["attr"])
+        entry.backups = [tuple(b) for b in data["backups"]]
+        entry.error = data["error"]
+        return entry
+
+    @property
+    def last_successful(self) -> Optional[float]:
+        times = [created for _, _, _, created, ok in self.backups if ok and created is not None]
+        return max(times) if times else None
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _, _, size, _, _ in self.backups)
+
+
+class BackupInventory:
+    """Backup inventory of one panel, built by fanning out over every server.
+
+    Only the leader process builds it, in the background, at most once per
+    ``ttl`` seconds or when a refresh was requested; every process answers
+    queries from the last published copy, which can take minutes to replace
+    on a large panel.
+    """
+
+    def __init__(self, panel: str, ttl: int = BACKUP_INVENTORY_TTL, concurrency: int = BACKUP_FANOUT_CONCURRENCY):
+        self.panel = panel
+        self.client = client_api.get_client(panel)
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.servers: Dict[str, ServerBackups] = {}
+        self.built_at: float = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at > 0
+
+    @property
+    def fresh(self) -> bool:
+        return self.ready and time.time() - self.built_at < self.ttl
+
+    async def _server_list(self) -> List[Dict[str, Any]]:
+        index = ownership.get_index(self.panel)
+        if index.ready:
+            return list(index.servers.values())
+        servers: List[Dict[str, Any]] = []
+        async for _, _, items in ptero_api.get_client(self.panel).iter_servers():
+            servers.extend(items)
+        return servers
+
+    async def build(self) -> None:
+        # Stamped with the start time: no listing in it is older than that
+        started = time.time()
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        entries = [ServerBackups(attr) for attr in await self._server_list() if attr.get("identifier")]
+
+        async def _fetch(entry: ServerBackups) -> None:
+            async with semaphore:
+                try:
+                    entry.load(await self.client.list_backups(entry.identifier))
+                except Exception:
+                    entry.error = 0
+
+        await asyncio.gather(*(_fetch(e) for e in entries))
+        self.servers = {e.identifier: e for e in entries}
+        self.built_at = started
+        failed = sum(1 for e in entries if e.error is not None)
+        logger.info("Backup inventory for %s built in %.0fs: %d servers, %d failed", self.panel, time.time() - started, len(entries), failed)
+
+    def _shared_key(self) -> str:
+        return f"backups:{self.panel}"
+
+    async def _load_shared(self) -> None:
+        snapshot = await coordinator.get_json(self._shared_key())
+        if snapshot and snapshot["built_at"] > self.built_at:
+            self.servers = {e.identifier: e for e in map(ServerBackups.from_dict, snapshot["servers"])}
+            self.built_at = snapshot["built_at"]
+
+    async def _publish(self) -> None:
+        # Kept until replaced: an old inventory is still worth showing with its age
+        await coordinator.set_json(self._shared_key(), {
+            "built_at": self.built_at,
+            "servers": [e.to_dict() for e in self.servers.values()],
+        })
+
+    async def request_refresh(self) -> None:
+        """Ask the leader to rebuild on its next pass, whichever process runs the command."""
+        await coordinator.set_json(f"{self._shared_key()}:refresh", time.time())
+
+    async def refresh_requested(self) -> bool:
+        requested = await coordinator.get_json(f"{self._shared_key()}:refresh")
+        return requested is not None and requested > self.built_at
+
+    async def sync(self) -> None:
+        """Adopt the published inventory; the leader also rebuilds it when due."""
+        await self._load_shared()
+        if not coordinator.is_leader:
+            return
+        if self.fresh and not await self.refresh_requested():
+            return
+        await self.build()
+        await self._publish()
+
+    async def refresh_server(self, identifier: str) -> None:
+        """Re-read one server after a create/delete so the cache stays accurate."""
+        entry = self.servers.get(identifier)
+        if entry is None:
+            return
+        entry.load(await self.client.list_backups(identifier))
+
+    def stale_servers(self, days: int) -> List[ServerBackups]:
+        """Servers with no successful backup in the last ``days`` days (oldest first)."""
+        cutoff = time.time() - days * 86400
+        stale = [e for e in self.servers.values() if e.error is None and (e.last_successful or 0) < cutoff]
+        return sorted(stale, key=lambda e: e.last_successful or 0)
+
+    def bytes_by_owner(self) -> List[Tuple[int, int]]:
+        """``(owner panel user id, total backup bytes)`` sorted by size, largest first."""
+        totals: Dict[int, int] = {}
+        for e in self.servers.values():
+            totals[e.owner] = totals.get(e.owner, 0) + e.total_bytes
+        return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)
+
+
+inventories: Dict[str, BackupInventory] = {name: BackupInventory(name) for name in ptero_api.panels}
+
+
+def get_inventory(panel: Optional[str] = None) -> BackupInventory:
+    return inventories[panel or ptero_api.DEFAULT_PANEL]
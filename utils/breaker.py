@@ -0,0 +1,83 @@
+import asyncio
+import time
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("ptero-bot.breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Trips after consecutive failures or slow responses and fails fast while open.
+
+    Once open, a background task calls ``probe`` every ``probe_interval``
+    seconds.  When the probe succeeds the breaker goes half-open and lets real
+    traffic through: the next success closes it, the next failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Awaitable[bool]],
+        failure_threshold: int = 5,
+        latency_threshold: float = 5.0,
+        probe_interval: float = 15.0,
+        name: str = "panel",
+    ):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.probe_interval = probe_interval
+        self.name = name
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def allow(self) -> bool:
+        return self.state != OPEN
+
+    def record_success(self, latency: float) -> None:
+        if latency > self.latency_threshold:
+            # A latency spike counts against the panel just like an error
+            self.record_failure()
+            return
+        if self.state == HALF_OPEN:
+            logger.info("Circuit %s closed", self.name)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self._trip()
+
+    def _trip(self) -> None:
+        logger.warning("Circuit %s opened after %d consecutive failures", self.name, self.failures)
+        self.state = OPEN
+        self.opened_at = time.time()
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def _probe_loop(self) -> None:
+        while self.state == OPEN:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                ok = await self.probe()
+            except Exception:
+                ok = False
+            if ok:
+                logger.info("Circuit %s half-open, probe succeeded", self.name)
+                self.state = HALF_OPEN
+
+    def describe(self) -> str:
+        if self.state == OPEN and self.opened_at:
+            return f"{self.state} for {time.time() - self.opened_at:.0f}s"
+        return self.state
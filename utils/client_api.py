@@ -0,0 +1,183 @@
+import os
+import time
+import asyncio
+import aiohttp
+from typing import Optional, Dict, Any, List, Tuple
+
+from utils import api as ptero_api
+from utils import ownership
+from utils.breaker import CircuitBreaker
+from utils.ratelimit import RateLimiter
+
+CLIENT_API_MAX_CONNECTIONS = int(os.getenv("CLIENT_API_MAX_CONNECTIONS", "20"))
+CLIENT_API_RATE = float(os.getenv("CLIENT_API_RATE", "4"))
+CLIENT_API_BURST = int(os.getenv("CLIENT_API_BURST", "8"))
+BULK_POWER_CONCURRENCY = int(os.getenv("BULK_POWER_CONCURRENCY", "5"))
+
+POWER_SIGNALS = ("start", "stop", "restart", "kill")
+
+
+class ClientAPI:
+    """Client API (``/api/client``) wrapper with its own pool, limiter, breaker and per-server ordering.
+
+    Power actions and console commands for the same server are serialized so
+    that e.g. a stop followed by a start reach the panel in that order; calls
+    for different servers run concurrently, bounded by the connection pool and
+    the rate limiter.
+
+    Calls the panel proxies to a node's daemon (power, console, resources,
+    backup changes) only count against the breaker when the panel itself can't
+    be reached: a 5xx or a timeout there usually means one node is down, which
+    must not cut off every other server.
+    """
+
+    def __init__(self, panel_url: str, api_key: str, max_connections: int = CLIENT_API_MAX_CONNECTIONS, rate: float = CLIENT_API_RATE, burst: int = CLIENT_API_BURST, name: str = "panel"):
+        self.panel_url = panel_url.rstrip("/")
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "Application/vnd.pterodactyl.v1+json",
+            "Content-Type": "application/json"
+        }
+        self.enabled = bool(api_key)
+        self.max_connections = max_connections
+        self.limiter = RateLimiter(rate, burst)
+        # Separate from the Application API breaker so Client API trouble never blocks panel reads or jobs
+        self.breaker = CircuitBreaker(
+            self.ping,
+            failure_threshold=ptero_api.BREAKER_FAILURE_THRESHOLD,
+            latency_threshold=ptero_api.BREAKER_LATENCY_THRESHOLD,
+            probe_interval=ptero_api.BREAKER_PROBE_INTERVAL,
+            name=f"{name} client API",
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._server_locks: Dict[str, asyncio.Lock] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                headers=self.headers,
+            )
+        return self._session
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def _lock_for(self, identifier: str) -> asyncio.Lock:
+        lock = self._server_locks.get(identifier)
+        if lock is None:
+            lock = self._server_locks[identifier] = asyncio.Lock()
+        return lock
+
+    async def _request(self, method: str, path: str, json: Optional[Dict[str, Any]] = None, daemon: bool = False) -> Dict[str, Any]:
+        """Send one Client API request; ``daemon`` marks calls the panel forwards to the node."""
+        if not self.enabled:
+            return {"status": 0, "data": {"error": "No Client API key is configured for this panel"}}
+        if not self.breaker.allow():
+            return {"status": 503, "data": {"error": "Panel unavailable, try again later"}}
+        await self.limiter.acquire()
+        url = f"{self.panel_url}/api/client{path}"
+        started = time.monotonic()
+        try:
+            async with self._get_session().request(method, url, json=json, timeout=aiohttp.ClientTimeout(total=ptero_api.PANEL_REQUEST_TIMEOUT)) as resp:
+                try:
+                    data = await resp.json() if resp.status != 204 else {}
+                except Exception:
+                    data = {}
+                result = {"status": resp.status, "data": data}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            timeout = isinstance(e, asyncio.TimeoutError)
+            # A daemon call may time out because the panel is waiting on an offline node
+            if not (daemon and timeout):
+                self.breaker.record_failure()
+            return {"status": 504 if timeout else 502, "data": {"error": f"Panel request failed: {e.__class__.__name__}"}}
+        if daemon:
+            # The panel answered; errors and slowness come from the node
+            self.breaker.record_success(0.0)
+        elif result["status"] >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success(time.monotonic() - started)
+        return result
+
+    async def ping(self) -> bool:
+        # Bypasses the breaker: this is the probe that closes it again
+        try:
+            async with self._get_session().get(f"{self.panel_url}/api/client/account", timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                return resp.status == 200
+        except Exception:
+            return False
+
+    async def power(self, identifier: str, signal: str) -> Dict[str, Any]:
+        if signal not in POWER_SIGNALS:
+            return {"status": 400, "data": {"error": f"Unknown power signal {signal}"}}
+        async with self._lock_for(identifier):
+            return await self._request("POST", f"/servers/{identifier}/power", json={"signal": signal}, daemon=True)
+
+    async def send_command(self, identifier: str, command: str) -> Dict[str, Any]:
+        async with self._lock_for(identifier):
+            return await self._request("POST", f"/servers/{identifier}/command", json={"command": command}, daemon=True)
+
+    async def resources(self, identifier: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/servers/{identifier}/resources", daemon=True)
+
+    async def list_backups(self, identifier: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/servers/{identifier}/backups?per_page=50")
+
+    async def create_backup(self, identifier: str, name: Optional[str] = None) -> Dict[str, Any]:
+        payload = {"name": name} if name else {}
+        async with self._lock_for(identifier):
+            return await self._request("POST", f"/servers/{identifier}/backups", json=payload, daemon=True)
+
+    async def delete_backup(self, identifier: str, backup_uuid: str) -> Dict[str, Any]:
+        async with self._lock_for(identifier):
+            return await self._request("DELETE", f"/servers/{identifier}/backups/{backup_uuid}", daemon=True)
+
+    async def restore_backup(self, identifier: str, backup_uuid: str, truncate: bool = False) -> Dict[str, Any]:
+        async with self._lock_for(identifier):
+            return await self._request("POST", f"/servers/{identifier}/backups/{backup_uuid}/restore", json={"truncate": truncate}, daemon=True)
+
+    async def bulk_power(self, identifiers: List[str], signal: str, concurrency: int = BULK_POWER_CONCURRENCY) -> List[Tuple[str, int]]:
+        """Send ``signal`` to many servers with at most ``concurrency`` in flight; returns ``(identifier, status)``."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _one(identifier: str) -> Tuple[str, int]:
+            async with semaphore:
+                try:
+                    resp = await self.power(identifier, signal)
+                except Exception:
+                    return identifier, 0
+                return identifier, resp.get("status", 0)
+
+        return list(await asyncio.gather(*(_one(i) for i in identifiers)))
+
+
+async def resolve_identifier(ref: str, panel: Optional[str] = None) -> Optional[str]:
+    """Map an Application API server ID (or an identifier) on ``panel`` to the Client API identifier."""
+    index = ownership.get_index(panel)
+    server_id = index.resolve_server(ref)
+    if server_id is not None:
+        return index.servers[server_id].get("identifier")
+    if not ref.isdigit():
+        return ref
+    resp = await ptero_api.get_client(panel).get_server(ref)
+    if resp.get("status") != 200:
+        return None
+    return (resp.get("data") or {}).get("attributes", {}).get("identifier")
+
+
+# One Client API pool and breaker per panel
+clients: Dict[str, ClientAPI] = {
+    name: ClientAPI(panel.url, panel.client_api_key, name=name)
+    for name, panel in ptero_api.panels.items()
+}
+
+
+def get_client(panel: Optional[str] = None) -> ClientAPI:
+    return clients[panel or ptero_api.DEFAULT_PANEL]
+
+
+async def close_clients():
+    await asyncio.gather(*(c.close() for c in clients.values()))
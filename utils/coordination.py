@@ -0,0 +1,415 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Tuple, AsyncIterator
+from urllib.parse import urlparse
+
+# memory | sqlite:///path/to/coordination.db | redis://[:password@]host:6379/0
+COORDINATION_BACKEND = os.getenv("COORDINATION_BACKEND", "memory")
+INSTANCE_ID = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+LEADER_TTL = float(os.getenv("LEADER_TTL", "30"))
+COORDINATION_PREFIX = os.getenv("COORDINATION_PREFIX", "ptero-bot:")
+# Deadline (seconds) for one request to a network backend; a hung connection is dropped
+COORDINATION_TIMEOUT = float(os.getenv("COORDINATION_TIMEOUT", "5"))
+# How often follower processes pick up state published by the leader
+SHARED_STATE_POLL_SECONDS = int(os.getenv("SHARED_STATE_POLL_SECONDS", "30"))
+
+logger = logging.getLogger("ptero-bot.coordination")
+
+
+class Backend(ABC):
+    """Shared key/value store used to coordinate bot processes.
+
+    Values are strings.  ``acquire`` and ``release`` implement expiring
+    ownership of a key (locks, reservations, leadership): ``acquire`` succeeds
+    when the key is free, expired or already held by ``owner`` (which renews
+    it), and ``release`` only deletes the key if ``owner`` still holds it.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        ...
+
+    @abstractmethod
+    async def release(self, key: str, owner: str) -> bool:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(Backend):
+    """Process-local backend: the default for a single bot process."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    def _live(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._live(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        current = self._live(key)
+        if current is not None and current != owner:
+            return False
+        self._data[key] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def release(self, key: str, owner: str) -> bool:
+        if self._live(key) != owner:
+            return False
+        del self._data[key]
+        return True
+
+
+class SQLiteBackend(Backend):
+    """Backend for several processes on one host sharing a SQLite file."""
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _run(self, fn):
+        with self._lock:
+            return fn(self._connect())
+
+    async def _call(self, fn):
+        return await asyncio.to_thread(self._run, fn)
+
+    async def get(self, key: str) -> Optional[str]:
+        def _get(conn):
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+            ).fetchone()
+            return row[0] if row else None
+        return await self._call(_get)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        def _set(conn):
+            now = time.time()
+            conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl if ttl else None))
+            # Expired rows are only ever skipped by readers; sweep them on writes
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        await self._call(_set)
+
+    async def delete(self, key: str) -> None:
+        await self._call(lambda conn: conn.execute("DELETE FROM kv WHERE key = ?", (key,)))
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        def _acquire(conn):
+            now = time.time()
+            # IMMEDIATE takes the write lock up front so check-and-set is atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+                free = row is None or row[0] == owner or (row[1] is not None and row[1] <= now)
+                if free:
+                    conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, owner, now + ttl))
+                conn.execute("COMMIT")
+                return free
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return await self._call(_acquire)
+
+    async def release(self, key: str, owner: str) -> bool:
+        def _release(conn):
+            return conn.execute("DELETE FROM kv WHERE key = ? AND value = ?", (key, owner)).rowcount > 0
+        return await self._call(_release)
+
+    async def close(self) -> None:
+        def _close():
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+        await asyncio.to_thread(_close)
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend(Backend):
+    """Backend speaking the Redis protocol (RESP) over one asyncio connection.
+
+    Only GET, SET, DEL and EVAL are used, so any Redis-compatible server
+    (Redis, Valkey, KeyDB, ...) works.  Requests are serialized on the single
+    connection, which is re-opened after a network error.  Every request has a
+    ``timeout`` deadline; a request that misses it raises ``asyncio.TimeoutError``
+    and drops the connection, since its reply may still arrive later.
+    """
+
+    # Take the key if free, or renew it if already ours
+    ACQUIRE = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end "
+        "if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then return 1 end return 0"
+    )
+    RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url: str, timeout: float = COORDINATION_TIMEOUT):
+        parsed = urlparse(url)
+        self.timeout = timeout
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode(args: Tuple[Any, ...]) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    async def _read_reply(self) -> Any:
+        line = await self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            return (await self._reader.readexactly(size + 2))[:-2].decode()
+        if kind == b"*":
+            size = int(rest)
+            if size < 0:
+                return None
+            return [await self._read_reply() for _ in range(size)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    async def _send(self, *args: Any) -> Any:
+        self._writer.write(self._encode(args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", self.db)
+
+    async def execute(self, *args: Any) -> Any:
+        async with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._writer is None:
+                        await asyncio.wait_for(self._connect(), self.timeout)
+                    return await asyncio.wait_for(self._send(*args), self.timeout)
+                except asyncio.TimeoutError:
+                    # Not retried: an unresponsive server would just double the wait
+                    await self._drop()
+                    raise
+                except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                    await self._drop()
+                    if attempt == 2:
+                        raise
+
+    async def _drop(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        self._reader = self._writer = None
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        if ttl:
+            await self.execute("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            await self.execute("SET", key, value)
+
+    async def delete(self, key: str) -> None:
+        await self.execute("DEL", key)
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(await self.execute("EVAL", self.ACQUIRE, 1, key, owner, int(ttl * 1000)))
+
+    async def release(self, key: str, owner: str) -> bool:
+        return bool(await self.execute("EVAL", self.RELEASE, 1, key, owner))
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._drop()
+
+
+def create_backend(url: str) -> Backend:
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith("redis://"):
+        return RedisBackend(url)
+    raise RuntimeError(f"Unsupported COORDINATION_BACKEND {url}")
+
+
+class Coordinator:
+    """Cross-process helpers on top of a :class:`Backend`.
+
+    - shared JSON state (``get_json`` / ``set_json``)
+    - locks for single-flight work and short-lived reservations
+    - leader election: only the leader runs background panel polling, the
+      other processes read what it publishes
+    """
+
+    def __init__(self, backend: Backend, instance_id: str = INSTANCE_ID, leader_ttl: float = LEADER_TTL, prefix: str = COORDINATION_PREFIX):
+        self.backend = backend
+        self.instance_id = instance_id
+        self.leader_ttl = leader_ttl
+        self.prefix = prefix
+        # Monotonic time our leader lease runs out, counted from when the renewal was sent
+        self._lease_until = 0.0
+        self._election_task: Optional[asyncio.Task] = None
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    # -----------------
+    # Shared state
+    # -----------------
+    async def get_json(self, key: str) -> Any:
+        raw = await self.backend.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self.backend.set(self._key(key), json.dumps(value, separators=(",", ":")), ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.backend.delete(self._key(key))
+
+    # -----------------
+    # Locks and reservations
+    # -----------------
+    async def reserve(self, key: str, ttl: float) -> Optional[str]:
+        """Claim ``key`` for ``ttl`` seconds; returns a token for :meth:`release`, or None if taken."""
+        token = f"{self.instance_id}:{uuid.uuid4().hex}"
+        if await self.backend.acquire(self._key(key), token, ttl):
+            return token
+        return None
+
+    async def release(self, key: str, token: str) -> None:
+        await self.backend.release(self._key(key), token)
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = 60, poll: float = 0.2) -> AsyncIterator[None]:
+        """Hold ``key`` across processes; waits for the current holder to finish."""
+        token = await self.reserve(key, ttl)
+        while token is None:
+            await asyncio.sleep(poll)
+            token = await self.reserve(key, ttl)
+        try:
+            yield
+        finally:
+            await self.release(key, token)
+
+    # -----------------
+    # Leader election
+    # -----------------
+    async def start(self) -> None:
+        await self._campaign()
+        self._election_task = asyncio.create_task(self._election_loop())
+
+    async def stop(self) -> None:
+        if self._election_task:
+            self._election_task.cancel()
+            self._election_task = None
+        if self.is_leader:
+            # Hand over right away instead of making the others wait for the TTL
+            self._lease_until = 0.0
+            try:
+                await self.backend.release(self._key("leader"), self.instance_id)
+            except Exception:
+                logger.exception("Could not release leadership")
+        await self.backend.close()
+
+    @property
+    def is_leader(self) -> bool:
+        """True only while the last successful renewal's lease lasts, even if a renewal is stuck."""
+        return time.monotonic() < self._lease_until
+
+    async def leader(self) -> Optional[str]:
+        return await self.backend.get(self._key("leader"))
+
+    async def _campaign(self) -> None:
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            leading = await asyncio.wait_for(self.backend.acquire(self._key("leader"), self.instance_id, self.leader_ttl), self.leader_ttl)
+        except Exception:
+            logger.exception("Leader election failed")
+            # Can't renew: assume the lease is lost rather than risk two leaders
+            leading = False
+        self._lease_until = started + self.leader_ttl if leading else 0.0
+        if leading != was_leader:
+            logger.info("Instance %s %s leadership", self.instance_id, "acquired" if leading else "lost")
+
+    async def _election_loop(self) -> None:
+        while True:
+            # Renew well before the lease runs out
+            await asyncio.sleep(self.leader_ttl / 3)
+            await self._campaign()
+
+
+coordinator = Coordinator(create_backend(COORDINATION_BACKEND))
@@ -1,5 +1,5 @@
 import discord
-from typing import Optional
+from typing import Optional, Dict, Any, List, Tuple
 
 # Colors
 GREEN = discord.Color.green()
@@ -23,3 +23,31 @@ def warn_embed(title: str, description: str = "", footer: Optional[str] = None)
     if footer:
         e.set_footer(text=footer)
     return e
+
+def stale_footer(resp: Dict[str, Any]) -> Optional[str]:
+    """Footer marking data served from cache while the panel is unreachable."""
+    if resp.get("stale"):
+        return "⚠️ Panel unreachable, showing last known data"
+    return None
+
+def job_embed(job: Any) -> discord.Embed:
+    """Status embed for a queued panel job (see utils.jobs.Job)."""
+    footer = f"Job #{job.id} | key {job.key}"
+    if job.state == "succeeded":
+        return success_embed("Job finished", job.describe(), footer=footer)
+    if job.state == "failed":
+        return error_embed("Job failed", job.describe(), footer=footer)
+    title = "Job running" if job.state == "running" else "Job queued"
+    return warn_embed(title, job.describe(), footer=footer)
+
+def fan_out_footer(results: List[Tuple[str, Dict[str, Any]]]) -> Optional[str]:
+    """Footer naming the panels that failed or served cached data in a fanned-out query."""
+    notes = []
+    for panel, resp in results:
+        if resp.get("status") != 200:
+            notes.append(f"{panel}: unreachable")
+        elif resp.get("stale"):
+            notes.append(f"{panel}: last known data")
+    if not notes:
+        return None
+    return "⚠️ " + " | ".join(notes)
@@ -0,0 +1,406 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Optional, Dict, Any, List, Callable, Awaitable, AsyncIterator
+
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "10"))
+# A running job whose worker stopped renewing it for this long is assumed orphaned and is re-run
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL = (SUCCEEDED, FAILED)
+
+logger = logging.getLogger("ptero-bot.jobs")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_run_at REAL NOT NULL,
+    completion_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (state, next_run_at);
+CREATE INDEX IF NOT EXISTS jobs_completion ON jobs (completion_at);
+"""
+
+
+class RetryableError(Exception):
+    """The mutation may or may not have happened; retry after re-checking."""
+
+
+class PermanentError(Exception):
+    """The mutation cannot succeed; fail the job without retrying."""
+
+
+class DeferredError(Exception):
+    """The target is unavailable right now (e.g. its breaker is open); retry later without using an attempt."""
+
+
+class Job:
+    __slots__ = ("id", "kind", "key", "payload", "state", "attempts", "result", "error", "created_at", "updated_at")
+
+    def __init__(self, row: sqlite3.Row):
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.key = row["idempotency_key"]
+        self.payload = json.loads(row["payload"])
+        self.state = row["state"]
+        self.attempts = row["attempts"]
+        self.result = json.loads(row["result"]) if row["result"] else None
+        self.error = row["error"]
+        self.created_at = row["created_at"]
+        self.updated_at = row["updated_at"]
+
+    @property
+    def done(self) -> bool:
+        return self.state in TERMINAL
+
+    def describe(self) -> str:
+        text = f"Job #{self.id} ({self.kind}): {self.state}, attempt {self.attempts}"
+        if self.error:
+            text += f"\nLast error: {self.error}"
+        return text
+
+
+Handler = Callable[[Job], Awaitable[Dict[str, Any]]]
+Completion = Callable[[Job], Awaitable[None]]
+
+
+class JobQueue:
+    """Write-ahead queue for panel mutations backed by SQLite.
+
+    A job is recorded before anything is sent to the panel.  Handlers must be
+    safe to re-run: on retry, and for jobs left ``running`` by a crash, they
+    are expected to check whether the mutation already happened first.
+
+    Several bot processes may share one database: claiming a job is a single
+    conditional UPDATE, and watchers poll the database for jobs run elsewhere.
+    A running job's lease is renewed while its handler runs, and the outcome is
+    only recorded if the job was not taken over in the meantime.
+
+    Side effects of a finished job (DMs, admin logs) belong in a callback set
+    with :meth:`on_complete`, not in the command that enqueued it: finishing a
+    job marks its completion as due, and workers of any process run due
+    completions until one returns without raising.  They run at least once, so
+    they must tolerate a repeat after a crash.
+
+    Results are stored as-is, so handlers must not return secrets.
+    """
+
+    def __init__(self, path: str = JOBS_DB, workers: int = JOB_WORKERS, max_attempts: int = JOB_MAX_ATTEMPTS, retry_delay: float = JOB_RETRY_DELAY, lease: float = JOB_LEASE_SECONDS):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.handlers: Dict[str, Handler] = {}
+        self.completions: Dict[str, Completion] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._claim_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._watchers: Dict[int, List[asyncio.Queue]] = {}
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self.handlers[kind] = handler
+
+    def on_complete(self, kind: str, callback: Completion) -> None:
+        """Run ``callback`` once each ``kind`` job succeeds or fails for good."""
+        self.completions[kind] = callback
+        self._wakeup.set()
+
+    # -----------------
+    # Storage
+    # -----------------
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("The job queue is stopped")
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._db_lock:
+            cur = self._connection().execute(sql, params)
+            rows = cur.fetchall()
+            self._conn.commit()
+            return rows
+
+    def _execute_count(self, sql: str, params: tuple = ()) -> int:
+        with self._db_lock:
+            cur = self._connection().execute(sql, params)
+            self._conn.commit()
+            return cur.rowcount
+
+    async def _db(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def _db_count(self, sql: str, params: tuple = ()) -> int:
+        return await asyncio.to_thread(self._execute_count, sql, params)
+
+    async def get(self, job_id: int) -> Optional[Job]:
+        rows = await self._db("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return Job(rows[0]) if rows else None
+
+    async def recent(self, limit: int = 10) -> List[Job]:
+        rows = await self._db("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return [Job(r) for r in rows]
+
+    # -----------------
+    # Lifecycle
+    # -----------------
+    async def start(self) -> None:
+        def _open():
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            return conn
+
+        self._conn = await asyncio.to_thread(_open)
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(max(1, self.workers))]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # A cancelled worker's query may still be running in its thread
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # -----------------
+    # Producers
+    # -----------------
+    async def enqueue(self, kind: str, key: str, payload: Dict[str, Any]) -> Job:
+        """Record a job, or return the existing job for ``key``.
+
+        A previously failed job with the same key is reset and run again.
+        """
+        now = time.time()
+        inserted = await self._db_count(
+            "INSERT OR IGNORE INTO jobs (kind, idempotency_key, payload, state, created_at, updated_at, next_run_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, key, json.dumps(payload), PENDING, now, now, now),
+        )
+        if not inserted:
+            # Only an older job is reset: a new one may already have failed in another worker
+            await self._db(
+                "UPDATE jobs SET state = ?, attempts = 0, error = NULL, completion_at = NULL, next_run_at = ?, updated_at = ? "
+                "WHERE idempotency_key = ? AND state = ?",
+                (PENDING, now, now, key, FAILED),
+            )
+        rows = await self._db("SELECT * FROM jobs WHERE idempotency_key = ?", (key,))
+        self._wakeup.set()
+        return Job(rows[0])
+
+    async def updates(self, job_id: int, timeout: Optional[float] = None) -> AsyncIterator[Job]:
+        """Yield the job each time its state changes, ending once it is terminal."""
+        watcher: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(job_id, []).append(watcher)
+        try:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            yield job
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not job.done:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return
+                wait = self.retry_delay if remaining is None else min(remaining, self.retry_delay)
+                try:
+                    update = await asyncio.wait_for(watcher.get(), wait)
+                except asyncio.TimeoutError:
+                    # The job may be running in another process: check the database
+                    update = await self.get(job_id)
+                    if update is None or (update.state, update.attempts) == (job.state, job.attempts):
+                        continue
+                job = update
+                yield job
+        finally:
+            self._watchers[job_id].remove(watcher)
+            if not self._watchers[job_id]:
+                del self._watchers[job_id]
+
+    # -----------------
+    # Workers
+    # -----------------
+    async def _notify(self, job_id: int) -> None:
+        if job_id not in self._watchers:
+            return
+        job = await self.get(job_id)
+        for watcher in self._watchers.get(job_id, []):
+            watcher.put_nowait(job)
+
+    async def _recover(self) -> None:
+        """Re-queue jobs whose process died mid-run; handlers re-check before acting."""
+        now = time.time()
+        recovered = await self._db_count(
+            "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ? AND updated_at <= ?",
+            (PENDING, now, RUNNING, now - self.lease),
+        )
+        if recovered:
+            logger.warning("Recovered %d interrupted jobs", recovered)
+
+    async def _claim(self) -> Optional[Job]:
+        async with self._claim_lock:
+            while True:
+                rows = await self._db(
+                    "SELECT * FROM jobs WHERE state = ? AND next_run_at <= ? ORDER BY next_run_at, id LIMIT 1",
+                    (PENDING, time.time()),
+                )
+                if not rows:
+                    return None
+                job = Job(rows[0])
+                # Conditional so that only one process wins a job
+                claimed = await self._db_count(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ? AND state = ?",
+                    (RUNNING, time.time(), job.id, PENDING),
+                )
+                if claimed:
+                    job.state = RUNNING
+                    job.attempts += 1
+                    return job
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            try:
+                job = await self._claim()
+                if job is None:
+                    await self._recover()
+                    await self._complete_due()
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.retry_delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._notify(job.id)
+                await self._run(job)
+                await self._complete_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # e.g. "database is locked" under contention; a running job is recovered once its lease expires
+                logger.exception("Job worker %d failed, retrying in %.0fs", number, self.retry_delay)
+                await asyncio.sleep(self.retry_delay)
+
+    async def _heartbeat(self, job: Job) -> None:
+        """Renew the lease of a running job so slow handlers are not recovered mid-run."""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await self._db(
+                    "UPDATE jobs SET updated_at = ? WHERE id = ? AND state = ? AND attempts = ?",
+                    (time.time(), job.id, RUNNING, job.attempts),
+                )
+            except sqlite3.Error:
+                logger.exception("Could not renew the lease of job %s", job.id)
+
+    async def checkpoint(self, job: Job, **values: Any) -> None:
+        """Merge ``values`` into the running job's stored result so later attempts see them in ``job.result``."""
+        job.result = {**(job.result or {}), **values}
+        updated = await self._db_count(
+            "UPDATE jobs SET result = ?, updated_at = ? WHERE id = ? AND state = ? AND attempts = ?",
+            (json.dumps(job.result), time.time(), job.id, RUNNING, job.attempts),
+        )
+        if not updated:
+            raise RetryableError(f"Job {job.id} was taken over by another worker")
+
+    async def _complete_due(self) -> None:
+        """Run the completion callbacks that are due, each claimed for one lease."""
+        if not self.completions:
+            return
+        kinds = tuple(self.completions)
+        now = time.time()
+        rows = await self._db(
+            f"SELECT * FROM jobs WHERE completion_at <= ? AND kind IN ({', '.join('?' * len(kinds))}) ORDER BY completion_at LIMIT 20",
+            (now, *kinds),
+        )
+        for row in rows:
+            # Conditional so that only one worker runs a completion; it is due again after a lease if we die
+            claimed = await self._db_count(
+                "UPDATE jobs SET completion_at = ? WHERE id = ? AND completion_at = ?",
+                (time.time() + self.lease, row["id"], row["completion_at"]),
+            )
+            if not claimed:
+                continue
+            job = Job(row)
+            try:
+                await self.completions[job.kind](job)
+            except Exception:
+                logger.exception("Completion of job %s (%s) failed; retrying after the lease", job.id, job.kind)
+                continue
+            await self._db("UPDATE jobs SET completion_at = NULL WHERE id = ?", (job.id,))
+
+    async def _finish(self, job: Job, sql: str, params: tuple) -> None:
+        """Record the outcome of this run only if the job is still ours (same state and attempt)."""
+        updated = await self._db_count(f"{sql} WHERE id = ? AND state = ? AND attempts = ?", params + (job.id, RUNNING, job.attempts))
+        if not updated:
+            logger.warning("Job %s (%s) was taken over by another worker; discarding this run's outcome", job.id, job.kind)
+
+    async def _run(self, job: Job) -> None:
+        handler = self.handlers.get(job.kind)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            if handler is None:
+                raise PermanentError(f"No handler for job kind {job.kind}")
+            result = await handler(job)
+        except PermanentError as e:
+            now = time.time()
+            await self._finish(job, "UPDATE jobs SET state = ?, error = ?, updated_at = ?, completion_at = ?", (FAILED, str(e), now, now))
+        except DeferredError as e:
+            now = time.time()
+            await self._finish(
+                job,
+                "UPDATE jobs SET state = ?, attempts = attempts - 1, error = ?, next_run_at = ?, updated_at = ?",
+                (PENDING, str(e), now + self.retry_delay, now),
+            )
+        except Exception as e:
+            now = time.time()
+            error = str(e) or e.__class__.__name__
+            if not isinstance(e, RetryableError):
+                logger.exception("Job %s (%s) raised", job.id, job.kind)
+            if job.attempts >= self.max_attempts:
+                await self._finish(job, "UPDATE jobs SET state = ?, error = ?, updated_at = ?, completion_at = ?", (FAILED, error, now, now))
+            else:
+                delay = self.retry_delay * (2 ** (job.attempts - 1))
+                await self._finish(
+                    job,
+                    "UPDATE jobs SET state = ?, error = ?, next_run_at = ?, updated_at = ?",
+                    (PENDING, error, now + delay, now),
+                )
+        else:
+            now = time.time()
+            # Checkpointed values stay unless the handler returns newer ones
+            await self._finish(
+                job,
+                "UPDATE jobs SET state = ?, result = ?, error = NULL, updated_at = ?, completion_at = ?",
+                (SUCCEEDED, json.dumps({**(job.result or {}), **result}), now, now),
+            )
+        finally:
+            heartbeat.cancel()
+        await self._notify(job.id)
+
+queue = JobQueue()
@@ -0,0 +1,122 @@
+from typing import Dict, Any
+
+from utils import api as ptero_api
+from utils import plans
+from utils.jobs import Job, RetryableError, PermanentError, DeferredError, queue
+
+
+def _raise_for(resp: Dict[str, Any], action: str) -> None:
+    """Map a failed panel response onto retry semantics."""
+    status = resp.get("status", 0)
+    detail = resp.get("error") or resp.get("data")
+    if status == 0 or status == 429 or status >= 500:
+        raise RetryableError(f"{action}: status {status}")
+    raise PermanentError(f"{action}: status {status} {detail}")
+
+
+def _panel(job: Job) -> ptero_api.PanelClient:
+    """The job's target panel; jobs for a panel whose breaker is open wait without using attempts."""
+    name = job.payload.get("panel") or ptero_api.DEFAULT_PANEL
+    if name not in ptero_api.panels:
+        raise PermanentError(f"Unknown panel {name}")
+    panel = ptero_api.get_client(name)
+    if not panel.breaker.allow():
+        raise DeferredError(f"Panel {name} unavailable ({panel.breaker.describe()})")
+    return panel
+
+
+def _attributes(data: Any) -> Dict[str, Any]:
+    if isinstance(data, dict):
+        if "attributes" in data:
+            return data["attributes"]
+        if isinstance(data.get("data"), dict):
+            return data["data"].get("attributes", {})
+    return {}
+
+
+async def create_server_job(job: Job) -> Dict[str, Any]:
+    """Create the panel user (if needed) and the server for a /createserver request.
+
+    The job's idempotency key doubles as the server's ``external_id``, so a
+    retry after a timeout finds the server created by the earlier attempt.
+    """
+    p = job.payload
+    panel = _panel(job)
+    existing = await panel.get_server_by_external_id(job.key)
+    if existing.get("status") == 200:
+        server = _attributes(existing.get("data"))
+        return {"server": server, "panel_username": p["username"], "panel_user_id": server.get("user")}
+    if existing.get("status") != 404:
+        _raise_for(existing, "Checking for existing server")
+
+    # Finding the user by email first makes user creation idempotent too
+    panel_email = f"{p['discord_id']}@discord.local"
+    result: Dict[str, Any] = {"panel_username": p["username"]}
+    found = await panel.find_user_by_email(panel_email)
+    if found:
+        panel_user_id = found.get("id") or found.get("attributes", {}).get("id")
+    else:
+        # Recorded before the user exists, so a retry that finds the user by email
+        # still knows the owner has no password yet. The generated password is
+        # never stored: the completion sets a fresh one and DMs it.
+        await queue.checkpoint(job, credentials_pending=True)
+        create_resp = await panel.create_user(email=panel_email, username=p["username"], first_name=p["first_name"], last_name="", password=None)
+        if create_resp.get("status") not in (201, 200):
+            _raise_for(create_resp, "Creating panel user")
+        panel_user_id = _attributes(create_resp.get("data")).get("id")
+    if not panel_user_id:
+        raise PermanentError("Could not determine panel user ID")
+
+    if p.get("plan"):
+        plan = plans.registry.get(p["plan"])
+        if plan is None:
+            raise PermanentError(f"Unknown plan {p['plan']}")
+        if plan.panel != panel.name:
+            raise PermanentError(f"Plan {p['plan']} belongs to panel {plan.panel}")
+        if not plan.ok:
+            if plan.unreachable:
+                # Recompiled in the background once the panel answers
+                raise RetryableError(f"Plan {p['plan']} is not compiled yet: {plan.error}")
+            raise PermanentError(f"Plan {p['plan']} is invalid: {plan.error}")
+        payload = plan.build(p["name"], int(panel_user_id))
+        payload["external_id"] = job.key
+        server_resp = await panel.create_server_from_payload(payload, p["node_id"])
+    else:
+        server_resp = await panel.create_server(
+            name=p["name"],
+            user_id=int(panel_user_id),
+            node_id=p["node_id"],
+            egg_id=p["egg_id"],
+            ram=p["ram"],
+            cpu=p["cpu"],
+            disk=p["disk"],
+            version=p["version"],
+            startup=p["version"],
+            external_id=job.key
+        )
+    if server_resp.get("status") not in (201, 200):
+        _raise_for(server_resp, "Creating server")
+    result["server"] = _attributes(server_resp.get("data"))
+    result["panel_user_id"] = int(panel_user_id)
+    return result
+
+
+async def delete_server_job(job: Job) -> Dict[str, Any]:
+    server_id = job.payload["server_id"]
+    panel = _panel(job)
+    existing = await panel.get_server(server_id)
+    if existing.get("status") == 404:
+        if job.attempts > 1:
+            # Already gone: an earlier attempt may have sent the DELETE and lost the reply
+            return {"server_id": server_id}
+        raise PermanentError("Server not found")
+    if existing.get("status") != 200:
+        _raise_for(existing, "Checking server")
+    resp = await panel.delete_server(server_id)
+    if resp.get("status") not in (204, 200, 404):
+        _raise_for(resp, "Deleting server")
+    return {"server_id": server_id}
+
+
+queue.register("create_server", create_server_job)
+queue.register("delete_server", delete_server_job)
@@ -0,0 +1,128 @@
+import os
+import time
+import logging
+from typing import Optional, Dict, Any, List, Set
+
+from utils import api as ptero_api
+from utils.cache import TTLCache
+from utils.ratelimit import RateLimiter
+from utils.reconcile import DISCORD_EMAIL_RE
+
+OWNERSHIP_LOOKUP_TTL = int(os.getenv("OWNERSHIP_LOOKUP_TTL", "600"))
+
+logger = logging.getLogger("ptero-bot.ownership")
+
+
+class OwnershipIndex:
+    """In-memory Discord user -> panel user -> servers index.
+
+    Rebuilt periodically from the paginated listings; between rebuilds it is
+    patched as the bot creates and deletes servers.  Self-service commands
+    answer ownership and status questions from here without touching the panel.
+    There is one index per configured panel.
+    """
+
+    def __init__(self, client: ptero_api.PanelClient):
+        self.client = client
+        self.discord_to_panel: Dict[int, int] = {}
+        self.servers_by_owner: Dict[int, Set[int]] = {}
+        self.servers: Dict[int, Dict[str, Any]] = {}
+        self.identifiers: Dict[str, int] = {}
+        self.refreshed_at: float = 0.0
+        # Misses resolved through the API (including "no such user") between rebuilds
+        self._lookups = TTLCache(ttl=OWNERSHIP_LOOKUP_TTL)
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at > 0
+
+    async def refresh(self, limiter: Optional[RateLimiter] = None) -> None:
+        discord_to_panel: Dict[int, int] = {}
+        async for _, _, users in self.client.iter_users(limiter=limiter):
+            for attr in users:
+                match = DISCORD_EMAIL_RE.match(attr.get("email") or "")
+                if match and attr.get("id") is not None:
+                    discord_to_panel[int(match.group(1))] = attr["id"]
+
+        servers: Dict[int, Dict[str, Any]] = {}
+        async for _, _, items in self.client.iter_servers(limiter=limiter):
+            for attr in items:
+                if attr.get("id") is not None:
+                    servers[attr["id"]] = attr
+
+        self._install(discord_to_panel, servers.values(), time.time())
+        logger.info("Ownership index for %s rebuilt: %d linked users, %d servers", self.client.name, len(discord_to_panel), len(servers))
+
+    def _install(self, discord_to_panel: Dict[int, int], servers, refreshed_at: float) -> None:
+        # Swap in the new state at once so readers never see a half-built index
+        self.discord_to_panel = discord_to_panel
+        self.servers = {}
+        self.servers_by_owner = {}
+        self.identifiers = {}
+        for attr in servers:
+            self.add_server(attr)
+        self._lookups.clear()
+        self.refreshed_at = refreshed_at
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable copy of the index, published by the leader process."""
+        return {
+            "refreshed_at": self.refreshed_at,
+            "users": list(self.discord_to_panel.items()),
+            "servers": list(self.servers.values()),
+        }
+
+    def load_snapshot(self, snapshot: Dict[str, Any]) -> bool:
+        """Adopt a published snapshot if it is newer than what we have."""
+        if not snapshot or snapshot["refreshed_at"] <= self.refreshed_at:
+            return False
+        self._install({int(d): p for d, p in snapshot["users"]}, snapshot["servers"], snapshot["refreshed_at"])
+        return True
+
+    def add_server(self, attr: Dict[str, Any]) -> None:
+        server_id = attr["id"]
+        self.servers[server_id] = attr
+        self.servers_by_owner.setdefault(attr.get("user"), set()).add(server_id)
+        if attr.get("identifier"):
+            self.identifiers[attr["identifier"]] = server_id
+
+    def remove_server(self, server_id: int) -> None:
+        attr = self.servers.pop(server_id, None)
+        if attr is None:
+            return
+        self.servers_by_owner.get(attr.get("user"), set()).discard(server_id)
+        self.identifiers.pop(attr.get("identifier"), None)
+
+    def resolve_server(self, ref: str) -> Optional[int]:
+        """Map a numeric server ID or short identifier to the numeric ID."""
+        if ref.isdigit() and int(ref) in self.servers:
+            return int(ref)
+        return self.identifiers.get(ref)
+
+    async def panel_user_for(self, discord_id: int) -> Optional[int]:
+        panel_id = self.discord_to_panel.get(discord_id)
+        if panel_id is not None:
+            return panel_id
+        cached = self._lookups.get(discord_id, False)
+        if cached is not False:
+            return cached
+        found = await self.client.find_user_by_email(f"{discord_id}@discord.local")
+        panel_id = (found.get("id") or found.get("attributes", {}).get("id")) if found else None
+        self._lookups.set(discord_id, panel_id)
+        if panel_id is not None:
+            self.discord_to_panel[discord_id] = panel_id
+        return panel_id
+
+    def servers_for(self, panel_user_id: int) -> List[Dict[str, Any]]:
+        ids = self.servers_by_owner.get(panel_user_id, ())
+        return [self.servers[i] for i in sorted(ids)]
+
+    def owns(self, panel_user_id: int, server_id: int) -> bool:
+        return server_id in self.servers_by_owner.get(panel_user_id, ())
+
+
+indexes: Dict[str, OwnershipIndex] = {name: OwnershipIndex(c) for name, c in ptero_api.panels.items()}
+
+
+def get_index(panel: Optional[str] = None) -> OwnershipIndex:
+    return indexes[panel or ptero_api.DEFAULT_PANEL]
@@ -0,0 +1,209 @@
+import json
+import os
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List
+
+from utils import api as ptero_api
+
+PLANS_FILE = os.getenv("PLANS_FILE", "plans.json")
+# Seconds between recompiles of plans whose egg could not be fetched
+PLAN_RETRY_SECONDS = int(os.getenv("PLAN_RETRY_SECONDS", "60"))
+
+logger = logging.getLogger("ptero-bot.plans")
+
+
+class PanelUnreachable(Exception):
+    """The egg definition could not be fetched; the plan is retried later."""
+
+
+class Plan:
+    """A named server template.
+
+    ``payload`` holds the precompiled create-server body (everything except
+    name, owner and allocation), or ``None`` when ``error`` explains why the
+    plan could not be compiled.  Egg IDs are per panel, so a plan is bound to
+    the panel named by its ``panel`` key (the default panel when omitted).
+    """
+
+    def __init__(self, name: str, raw: Dict[str, Any]):
+        self.name = name
+        self.raw = raw
+        self.panel = raw.get("panel") or ptero_api.DEFAULT_PANEL
+        self.payload: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        # Compilation failed because the panel did not answer, not because the plan is wrong
+        self.unreachable = False
+
+    @property
+    def ok(self) -> bool:
+        return self.payload is not None
+
+    def build(self, name: str, user_id: int) -> Dict[str, Any]:
+        payload = dict(self.payload or {})
+        payload["name"] = name
+        payload["user"] = user_id
+        return payload
+
+    def summary(self) -> str:
+        if not self.ok:
+            return f"{self.name}: INVALID ({self.error})"
+        limits = self.payload["limits"]
+        where = f" @ {self.panel}" if ptero_api.multi_panel() else ""
+        return f"{self.name}{where}: egg {self.payload['egg']} | RAM {limits['memory']} MB | CPU {limits['cpu']} | Disk {limits['disk']} MB"
+
+
+class PlanRegistry:
+    """Plans loaded from PLANS_FILE and compiled against cached egg definitions."""
+
+    def __init__(self, path: str = PLANS_FILE):
+        self.path = path
+        self.plans: Dict[str, Plan] = {}
+
+    def load(self) -> Dict[str, Plan]:
+        """Parse PLANS_FILE; the plans are installed by :meth:`compile`."""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as fh:
+            raw = json.load(fh)
+        return {name: Plan(name, spec) for name, spec in raw.items()}
+
+    async def compile(self, max_ram: int, max_cpu: int, max_disk: int, plans: Optional[Dict[str, Plan]] = None) -> None:
+        """Compile ``plans`` (a fresh copy of the current ones by default) and swap them in.
+
+        The current plans stay usable until every new one is compiled.
+        """
+        if plans is None:
+            plans = {name: Plan(name, plan.raw) for name, plan in self.plans.items()}
+        await _prefetch_eggs(plans.values())
+        for plan in plans.values():
+            await _compile_into(plan, max_ram, max_cpu, max_disk)
+        self.plans = plans
+
+    async def retry_unreachable(self, max_ram: int, max_cpu: int, max_disk: int) -> None:
+        """Recompile, in place, plans that failed only because their panel was unreachable."""
+        for plan in [p for p in self.plans.values() if p.unreachable]:
+            await _compile_into(plan, max_ram, max_cpu, max_disk)
+            if plan.ok:
+                logger.info("Plan %s compiled after the panel became reachable", plan.name)
+
+    def get(self, name: str) -> Optional[Plan]:
+        return self.plans.get(name)
+
+    def names(self) -> List[str]:
+        return sorted(self.plans)
+
+
+async def _prefetch_eggs(plans) -> None:
+    """Fetch every distinct egg definition concurrently so compiling reads from the cache."""
+    eggs = set()
+    for plan in plans:
+        try:
+            eggs.add((plan.panel, int(plan.raw["nest"]), int(plan.raw["egg"])))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+    await asyncio.gather(
+        *(ptero_api.get_client(panel).get_egg_definition(nest, egg) for panel, nest, egg in eggs if panel in ptero_api.panels),
+        return_exceptions=True,
+    )
+
+
+async def _compile_into(plan: Plan, max_ram: int, max_cpu: int, max_disk: int) -> None:
+    try:
+        if plan.panel not in ptero_api.panels:
+            raise ValueError(f"unknown panel {plan.panel}")
+        payload = await _compile_plan(ptero_api.get_client(plan.panel), plan.raw, max_ram, max_cpu, max_disk)
+    except PanelUnreachable as e:
+        plan.payload, plan.error, plan.unreachable = None, str(e), True
+        logger.warning("Plan %s not compiled yet: %s", plan.name, e)
+    except Exception as e:
+        # One malformed plan (e.g. limits that are not an object) must not stop the others
+        plan.payload, plan.error, plan.unreachable = None, str(e) or type(e).__name__, False
+        logger.warning("Plan %s is invalid: %s", plan.name, plan.error)
+    else:
+        plan.payload, plan.error, plan.unreachable = payload, None, False
+
+
+def _positive_int(value: Any, field: str, maximum: Optional[int] = None) -> int:
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an integer")
+    if value <= 0:
+        raise ValueError(f"{field} must be positive")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"{field} exceeds maximum of {maximum}")
+    return value
+
+
+async def _compile_plan(panel: ptero_api.PanelClient, raw: Dict[str, Any], max_ram: int, max_cpu: int, max_disk: int) -> Dict[str, Any]:
+    if "egg" not in raw or "nest" not in raw:
+        raise ValueError("plan must define both nest and egg")
+    egg_id = _positive_int(raw["egg"], "egg")
+    nest_id = _positive_int(raw["nest"], "nest")
+
+    limits = raw.get("limits") or {}
+    if not isinstance(limits, dict):
+        raise ValueError("limits must be an object")
+    compiled_limits = {
+        "memory": _positive_int(limits.get("memory"), "limits.memory", max_ram),
+        "swap": int(limits.get("swap", 0)),
+        "disk": _positive_int(limits.get("disk"), "limits.disk", max_disk),
+        "io": int(limits.get("io", 500)),
+        "cpu": _positive_int(limits.get("cpu"), "limits.cpu", max_cpu),
+    }
+    features = raw.get("feature_limits") or {}
+    if not isinstance(features, dict):
+        raise ValueError("feature_limits must be an object")
+    compiled_features = {
+        "databases": int(features.get("databases", 0)),
+        "backups": int(features.get("backups", 0)),
+        "allocations": int(features.get("allocations", 0)),
+    }
+
+    egg_resp = await panel.get_egg_definition(nest_id, egg_id)
+    status = egg_resp.get("status", 0)
+    if status == 0 or status == 429 or status >= 500:
+        raise PanelUnreachable(f"panel {panel.name} unreachable (status {status}) while fetching egg {egg_id}")
+    if status != 200:
+        raise ValueError(f"egg {egg_id} in nest {nest_id} not found (status {status})")
+    egg = (egg_resp.get("data") or {}).get("attributes", {})
+
+    docker_image = raw.get("docker_image") or egg.get("docker_image")
+    if not docker_image and egg.get("docker_images"):
+        docker_image = next(iter(egg["docker_images"].values()))
+    if not docker_image:
+        raise ValueError("no docker_image in plan or egg")
+
+    variables = egg.get("relationships", {}).get("variables", {}).get("data", [])
+    environment: Dict[str, str] = {}
+    required = set()
+    for var in variables:
+        attr = var.get("attributes", var)
+        env_name = attr.get("env_variable")
+        if not env_name:
+            continue
+        environment[env_name] = attr.get("default_value") or ""
+        if "required" in (attr.get("rules") or "").split("|"):
+            required.add(env_name)
+
+    overrides = raw.get("environment") or {}
+    unknown = set(overrides) - set(environment)
+    if unknown:
+        raise ValueError(f"unknown environment variables for egg: {', '.join(sorted(unknown))}")
+    environment.update({k: str(v) for k, v in overrides.items()})
+    missing = sorted(k for k in required if not environment.get(k))
+    if missing:
+        raise ValueError(f"missing required environment variables: {', '.join(missing)}")
+
+    return {
+        "egg": egg_id,
+        "docker_image": docker_image,
+        "startup": raw.get("startup") or egg.get("startup") or "",
+        "environment": environment,
+        "limits": compiled_limits,
+        "feature_limits": compiled_features,
+    }
+
+
+registry = PlanRegistry()
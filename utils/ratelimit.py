@@ -0,0 +1,58 @@
+import asyncio
+import time
+from typing import Dict, Hashable, Tuple
+
+
+class RateLimiter:
+    """Async token bucket: at most ``rate`` acquisitions per second, bursting up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class UserQuota:
+    """Fixed-window per-key quota: at most ``limit`` uses every ``window`` seconds."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._usage: Dict[Hashable, Tuple[float, int]] = {}
+
+    def consume(self, key: Hashable) -> bool:
+        """Record one use for ``key``; return False if the quota is already spent."""
+        now = time.monotonic()
+        start, count = self._usage.get(key, (now, 0))
+        if now - start >= self.window:
+            start, count = now, 0
+        if count >= self.limit:
+            return False
+        self._usage[key] = (start, count + 1)
+        return True
+
+    def retry_after(self, key: Hashable) -> float:
+        start, _ = self._usage.get(key, (time.monotonic(), 0))
+        return max(0.0, self.window - (time.monotonic() - start))
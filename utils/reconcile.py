@@ -0,0 +1,146 @@
+import re
+import time
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+from utils import api as ptero_api
+from utils.ratelimit import RateLimiter
+
+DISCORD_EMAIL_RE = re.compile(r"^(\d+)@discord\.local$")
+
+
+class ReconcileReport:
+    """Result of one full reconciliation pass."""
+
+    def __init__(self):
+        self.finished_at = time.time()
+        self.user_count = 0
+        self.server_count = 0
+        # (panel user id, username, discord id) for members no longer in any guild
+        self.orphan_users: List[Tuple[int, str, int]] = []
+        # (server id, name, owner panel id) whose owner is orphaned or unknown
+        self.orphan_servers: List[Tuple[int, str, int]] = []
+        # (server id, name, "memory 40960 > 32768, ...")
+        self.limit_violations: List[Tuple[int, str, str]] = []
+
+    def summary(self) -> str:
+        return (
+            f"Users scanned: {self.user_count}\n"
+            f"Servers scanned: {self.server_count}\n"
+            f"Orphaned panel users: {len(self.orphan_users)}\n"
+            f"Orphaned servers: {len(self.orphan_servers)}\n"
+            f"Limit violations: {len(self.limit_violations)}"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReconcileReport":
+        report = cls()
+        report.__dict__.update(data)
+        return report
+
+
+class Reconciler:
+    """Incrementally scans panel users and servers and joins them against guild membership.
+
+    Each call to :meth:`step` fetches at most ``pages_per_step`` pages through a
+    dedicated rate limiter, so a full pass over a large panel is spread across
+    many steps.  The cursor survives between steps; when both listings are
+    exhausted the pass is joined and a :class:`ReconcileReport` is returned.
+    """
+
+    def __init__(self, client: ptero_api.PanelClient, limits: Dict[str, int], limiter: RateLimiter, pages_per_step: int = 5, per_page: int = 100):
+        self.client = client
+        self.limits = limits
+        self.limiter = limiter
+        self.pages_per_step = pages_per_step
+        self.per_page = per_page
+        self._reset()
+
+    def _reset(self) -> None:
+        self.phase = "users"
+        self.next_page = 1
+        self.total_pages = 0
+        self.panel_user_ids: Set[int] = set()
+        # panel user id -> (discord id, username) for users created by the bot
+        self.discord_users: Dict[int, Tuple[int, str]] = {}
+        # (id, name, owner, memory, cpu, disk)
+        self.servers: List[Tuple[int, str, int, int, int, int]] = []
+        self.started_at = time.time()
+
+    def progress(self) -> str:
+        return f"{self.phase} page {self.next_page}/{self.total_pages or '?'}"
+
+    async def step(self, member_ids: Set[int]) -> Optional[ReconcileReport]:
+        source = self.client.iter_users if self.phase == "users" else self.client.iter_servers
+        fetched = 0
+        async for page, total_pages, items in source(per_page=self.per_page, start_page=self.next_page, limiter=self.limiter):
+            self.total_pages = total_pages
+            if self.phase == "users":
+                self._ingest_users(items)
+            else:
+                self._ingest_servers(items)
+            fetched += 1
+            if page >= total_pages:
+                if self.phase == "users":
+                    self.phase = "servers"
+                    self.next_page = 1
+                    self.total_pages = 0
+                    return None
+                report = self._join(member_ids)
+                self._reset()
+                return report
+            self.next_page = page + 1
+            if fetched >= self.pages_per_step:
+                break
+        return None
+
+    def _ingest_users(self, items: List[Dict[str, Any]]) -> None:
+        for attr in items:
+            user_id = attr.get("id")
+            if user_id is None:
+                continue
+            self.panel_user_ids.add(user_id)
+            match = DISCORD_EMAIL_RE.match(attr.get("email") or "")
+            if match:
+                self.discord_users[user_id] = (int(match.group(1)), attr.get("username") or "")
+
+    def _ingest_servers(self, items: List[Dict[str, Any]]) -> None:
+        for attr in items:
+            limits = attr.get("limits") or {}
+            self.servers.append((
+                attr.get("id"),
+                attr.get("name") or "",
+                attr.get("user"),
+                int(limits.get("memory") or 0),
+                int(limits.get("cpu") or 0),
+                int(limits.get("disk") or 0),
+            ))
+
+    def _join(self, member_ids: Set[int]) -> ReconcileReport:
+        report = ReconcileReport()
+        report.user_count = len(self.panel_user_ids)
+        report.server_count = len(self.servers)
+
+        orphan_ids = {uid for uid, (discord_id, _) in self.discord_users.items() if discord_id not in member_ids}
+        report.orphan_users = sorted(
+            (uid, self.discord_users[uid][1], self.discord_users[uid][0]) for uid in orphan_ids
+        )
+        # Owners that are gone from the panel or belong to departed members
+        untracked = orphan_ids | ({owner for _, _, owner, _, _, _ in self.servers} - self.panel_user_ids)
+
+        max_ram, max_cpu, max_disk = self.limits["memory"], self.limits["cpu"], self.limits["disk"]
+        for server_id, name, owner, memory, cpu, disk in self.servers:
+            if owner in untracked:
+                report.orphan_servers.append((server_id, name, owner))
+            problems = []
+            # The panel uses 0 for "unlimited", which always exceeds our maxima
+            for label, value, maximum in (("memory", memory, max_ram), ("cpu", cpu, max_cpu), ("disk", disk, max_disk)):
+                if value == 0:
+                    problems.append(f"{label} unlimited")
+                elif value > maximum:
+                    problems.append(f"{label} {value} > {maximum}")
+            if problems:
+                report.limit_violations.append((server_id, name, ", ".join(problems)))
+        return report
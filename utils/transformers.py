@@ -0,0 +1,26 @@
+from typing import List
+
+import discord
+from discord import app_commands
+
+from utils import api as ptero_api
+
+
+class PanelTransformer(app_commands.Transformer):
+    """``panel`` command option: autocompletes configured panel names and rejects unknown ones."""
+
+    async def transform(self, interaction: discord.Interaction, value: str) -> str:
+        if value not in ptero_api.panels:
+            raise app_commands.TransformerError(value, self.type, self)
+        return value
+
+    async def autocomplete(self, interaction: discord.Interaction, value: str) -> List[app_commands.Choice[str]]:
+        current = value.lower()
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in ptero_api.panel_names()
+            if current in name.lower()
+        ][:25]
+
+
+PanelName = app_commands.Transform[str, PanelTransformer]